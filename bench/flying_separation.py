@@ -0,0 +1,63 @@
+'''Frame time of FlyingEnemy movement at 30/100/300 vampires, for the per-sprite path
+bucketed by NeighbourIndex and for the batched EnemyStore path when numpy is installed.
+
+Run from the repo root: python bench/flying_separation.py
+'''
+import os
+import sys
+import random
+from time import perf_counter
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+os.chdir(ROOT)
+
+from main import Game
+from enemy import FlyingEnemy
+from swarm import make_enemy_store
+
+COUNTS = [30, 100, 300]
+FRAMES = 120
+DT = 1 / 60
+
+def spawn_vampires(game, count):
+    for enemy in game.enemy_sprites:
+        enemy.kill()
+
+    room_x, room_y = game.room_positions[(0, 0)]
+    room = game.rooms[(0, 0)]
+    for _ in range(count):
+        pos = (room_x + random.uniform(48, room.width * 16 - 48), room_y + random.uniform(48, room.height * 16 - 48))
+        FlyingEnemy(pos, game.enemy_frames['vampire'], (game.all_sprites, game.enemy_sprites), game.player, game.collision_sprites, game)
+
+def run(game, count, store):
+    # enemies only take a store slot when they spawn, so the store is swapped in before spawning
+    game.enemy_store = store
+    if store:
+        store.clear()
+    spawn_vampires(game, count)
+
+    times = []
+    for _ in range(FRAMES):
+        start = perf_counter()
+        game.update_enemy_kinematics(DT)
+        for enemy in game.enemy_sprites:
+            enemy.update(DT)
+        times.append(perf_counter() - start)
+    times.sort()
+    return sum(times) / len(times), times[len(times) // 2]
+
+if __name__ == '__main__':
+    random.seed(0)
+    game = Game()
+    paths = [('per sprite', None)]
+    store = make_enemy_store()
+    if store:
+        paths.append(('batched', store))
+
+    print(f'{"path":<10}  {"vampires":>8}  {"mean ms":>8}  {"median ms":>9}')
+    for name, path_store in paths:
+        for count in COUNTS:
+            mean, median = run(game, count, path_store)
+            print(f'{name:<10}  {count:>8}  {mean * 1000:>8.2f}  {median * 1000:>9.2f}')
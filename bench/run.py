@@ -0,0 +1,182 @@
+'''Micro-benchmarks of the per-frame hot paths, reported as ops/sec and per call latency.
+
+Run from the repo root:
+    python bench/run.py                              compare against bench/baseline.json
+    python bench/run.py --enemies 200 --walls 60     bigger scene
+    python bench/run.py --only Enemy.move --json out.json
+    python bench/run.py --save-baseline              store this machine's numbers as the baseline
+
+Benchmarks are compared by ops/sec, a drop larger than --tolerance is reported as a regression
+and makes the script exit with status 1. Baselines only mean something on the machine that saved them.
+'''
+import argparse
+import json
+import os
+import platform
+from time import perf_counter
+
+import pygame
+from scene import ROOT, Scene, DEFAULT_COUNTS, make_game, SIM_DT
+
+BASELINE = os.path.join(ROOT, 'bench', 'baseline.json')
+
+# per benchmark: what one op is run on, and the call that does one op
+def ground_enemies(scene):
+    return [enemy for enemy in scene.enemies if not enemy.flying]
+
+def flying_enemies(scene):
+    return [enemy for enemy in scene.enemies if enemy.flying]
+
+def enemy_move(enemy):
+    # with the enemy store the chase and separation already ran in update_enemy_kinematics, see Game.update_enemy_kinematics
+    enemy.move(SIM_DT)
+
+def enemy_kinematics(game):
+    game.update_enemy_kinematics(SIM_DT)
+
+def enemy_sight(enemy):
+    enemy.has_line_of_sight()
+
+def turret_find_target(turret):
+    turret.find_target()
+
+def bullet_update(bullet):
+    bullet.update(SIM_DT)
+
+def trap_check_collision(trap):
+    # traps stay armed, check_collision is what an untriggered trap runs every frame
+    trap.check_collision(trap.game.enemy_sprites)
+    trap.triggered = False
+
+def wire_update(wire):
+    wire.update(SIM_DT)
+
+def draw_world(game):
+    game.draw_world(SIM_DT)
+
+def hud_draw(game):
+    game.hud.draw(game.display_surface)
+
+def traps(scene):
+    return [sprite for sprite in scene.game.trap_sprites if hasattr(sprite, 'check_collision')]
+
+def wires(scene):
+    return [sprite for sprite in scene.game.trap_sprites if hasattr(sprite, 'slow_factor')]
+
+BENCHMARKS = {
+    'Enemy.move': (ground_enemies, enemy_move),
+    'Enemy.has_line_of_sight': (ground_enemies, enemy_sight),
+    'FlyingEnemy.move': (flying_enemies, enemy_move),
+    'Game.update_enemy_kinematics': (lambda scene: [scene.game], enemy_kinematics),
+    'Turret.find_target': (lambda scene: scene.game.turret_sprites.sprites(), turret_find_target),
+    'Bullet.update': (lambda scene: scene.game.bullet_sprites.sprites(), bullet_update),
+    'Trap.check_collision': (traps, trap_check_collision),
+    'BarbedWire.update': (wires, wire_update),
+    'Game.draw_world': (lambda scene: [scene.game], draw_world),
+    'HUD.draw': (lambda scene: [scene.game], hud_draw),
+}
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def measure(scene, targets, call, rounds):
+    # every round starts from the restored scene, only the calls themselves are timed
+    times = []
+    rates = []
+    for _ in range(rounds):
+        scene.restore()
+        scene.new_frame()
+        round_time = 0
+        round_targets = targets(scene)
+        for target in round_targets:
+            start = perf_counter()
+            call(target)
+            elapsed = perf_counter() - start
+            times.append(elapsed)
+            round_time += elapsed
+        if round_time:
+            rates.append(len(round_targets) / round_time)
+
+    if not times:
+        return None
+
+    # the median round keeps a few slow frames from the os or the gc out of the comparison
+    total = sum(times)
+    times.sort()
+    rates.sort()
+    return {
+        'calls': len(times),
+        'ops_per_sec': percentile(rates, 0.5),
+        'mean_us': total / len(times) * 1e6,
+        'p50_us': percentile(times, 0.5) * 1e6,
+        'p95_us': percentile(times, 0.95) * 1e6,
+        'p99_us': percentile(times, 0.99) * 1e6,
+    }
+
+def run(room, counts, rounds, only = None, seed = 0):
+    scene = Scene(make_game(seed), room, seed, **counts)
+    results = {}
+    for name, (targets, call) in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        # one untimed round so caches and pools are warm
+        measure(scene, targets, call, 1)
+        results[name] = measure(scene, targets, call, rounds)
+    return {
+        'scene': {'room': room, 'seed': seed, 'rounds': rounds, **scene.counts},
+        'machine': {'python': platform.python_version(), 'pygame': pygame.version.ver, 'platform': platform.platform()},
+        'results': results,
+    }
+
+def compare(report, baseline, tolerance):
+    # returns the names of the benchmarks that got slower than the tolerance allows
+    if baseline and baseline['scene'] != report['scene']:
+        print(f"warning: baseline scene {baseline['scene']} differs from this run")
+
+    regressions = []
+    print(f'{"benchmark":<30} {"ops/sec":>12} {"p50 us":>9} {"p95 us":>9} {"baseline":>12} {"change":>8}')
+    for name, result in report['results'].items():
+        if result is None:
+            print(f'{name:<30} {"no targets in scene":>12}')
+            continue
+
+        old = baseline['results'].get(name) if baseline else None
+        line = f"{name:<30} {result['ops_per_sec']:>12.0f} {result['p50_us']:>9.1f} {result['p95_us']:>9.1f}"
+        if old:
+            change = result['ops_per_sec'] / old['ops_per_sec'] - 1
+            line += f" {old['ops_per_sec']:>12.0f} {change:>+8.1%}"
+            if change < -tolerance:
+                line += '  REGRESSION'
+                regressions.append(name)
+        print(line)
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the per-frame hot paths in a synthetic scene')
+    parser.add_argument('--room', default='room_1.tmx', help='room template the scene is built in')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rounds', type=int, default=100, help='frames measured per benchmark')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='run only these benchmarks')
+    for name, count in DEFAULT_COUNTS.items():
+        parser.add_argument(f'--{name}', type=int, default=count)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', default=BASELINE, help='results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed ops/sec drop before a benchmark counts as a regression')
+    args = parser.parse_args()
+
+    counts = {name: getattr(args, name) for name in DEFAULT_COUNTS}
+    report = run(args.room, counts, args.rounds, args.only, args.seed)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    regressions = compare(report, baseline, args.tolerance)
+
+    for path in filter(None, (args.json, args.baseline if args.save_baseline else None)):
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+
+    raise SystemExit(1 if regressions else 0)
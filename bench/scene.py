@@ -0,0 +1,149 @@
+'''Synthetic benchmark scenes built inside one of the real rooms from maps/tsx/tboi.
+
+A scene swaps the chosen template into a placed room, moves the player there and
+fills it with enemies, walls, turrets, bullets, traps and barbed wire on free tiles.
+'''
+import os
+import sys
+import random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+os.chdir(ROOT)
+
+from settings import *
+from main import Game
+from room import Room, RoomIndex, load_template
+from sprites import Sprite, Trap, BarbedWire
+from enemy import Enemy, FlyingEnemy
+from turret import Turret
+from headless import enter_room
+
+# grid of the room the scene is built in, next to the start room so it is realised from the start
+SCENE_ROOM = (1, 0)
+# enemies in a scene never die, so every round of a benchmark sees the same swarm
+SCENE_ENEMY_HEALTH = 10 ** 9
+SCENE_BULLET_LIFETIME = 10 ** 9
+
+DEFAULT_COUNTS = {'enemies': 60, 'flying': 30, 'walls': 20, 'turrets': 8, 'bullets': 60, 'traps': 20, 'wires': 20}
+
+def make_game(seed = 0):
+    random.seed(seed)
+    return Game(headless = True)
+
+def use_template(game, grid, name):
+    # replace the placed room with another template, keeping its doors
+    old = game.rooms[grid]
+    game.release_room(grid)
+
+    room = Room(load_template(os.path.join(ROOMS_DIR, name)), old.doors)
+    room.enemies_spawned = True # the scene brings its own enemies
+    game.rooms[grid] = room
+    game.render_room_to_surface(room)
+    game.room_index = RoomIndex(game.rooms, game.room_positions)
+    game.realise_room(grid)
+    return room
+
+class Scene:
+    '''One filled benchmark room, restore() puts every enemy and bullet back where it started'''
+    def __init__(self, game, room = 'room_1.tmx', seed = 0, **counts):
+        self.game = game
+        self.room_name = room
+        self.counts = {**DEFAULT_COUNTS, **counts}
+        self.random = random.Random(seed)
+
+        self.clear()
+        self.room = use_template(game, SCENE_ROOM, room)
+        enter_room(game, SCENE_ROOM)
+        game.step(SIM_DT)
+
+        self.free = self.free_tiles()
+        self.random.shuffle(self.free)
+
+        self.add_walls(self.counts['walls'])
+        self.add_structures(self.counts['turrets'], self.counts['traps'], self.counts['wires'])
+        self.enemies = self.add_enemies(self.counts['enemies'], 'goblin', Enemy) + self.add_enemies(self.counts['flying'], 'vampire', FlyingEnemy)
+        self.start_positions = [(enemy, enemy.hitbox_rect.center) for enemy in self.enemies]
+
+        self.bullet_directions = [pygame.Vector2(1, 0).rotate(self.random.uniform(0, 360)) for _ in range(self.counts['bullets'])]
+        self.restore()
+
+    def clear(self):
+        game = self.game
+        for group in (game.enemy_sprites, game.bullet_sprites, game.turret_sprites, game.trap_sprites):
+            for sprite in group.sprites():
+                sprite.kill()
+
+    def free_tiles(self):
+        # centers of tiles that are walkable along with all their neighbours, the player's tile excluded
+        grid = self.game.occupancy
+        px, py = self.game.room_positions[SCENE_ROOM]
+        left, top = grid.cell_at((px, py))
+        player_cell = grid.cell_at(self.game.player.rect.center)
+
+        tiles = []
+        for cx in range(left + 1, left + grid.cols - 1):
+            for cy in range(top + 1, top + grid.rows - 1):
+                if (cx, cy) == player_cell:
+                    continue
+                if not any(grid.blocked(cx + dx, cy + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+                    tiles.append(((cx + 0.5) * TILE_SIZE, (cy + 0.5) * TILE_SIZE))
+        return tiles
+
+    def take(self):
+        # free tiles are handed out once, scenes asking for more than the room holds reuse them
+        pos = self.free.pop()
+        self.free.insert(0, pos)
+        return pygame.Vector2(pos)
+
+    def add_walls(self, count):
+        game = self.game
+        for _ in range(count):
+            pos = self.take() - (TILE_SIZE / 2, TILE_SIZE / 2)
+            wall = Sprite(pos, pygame.Surface((TILE_SIZE, TILE_SIZE)), (game.all_sprites, game.collision_sprites))
+            wall.is_buildable = True
+            game.structure_changed(wall.rect)
+
+    def add_structures(self, turrets, traps, wires):
+        game = self.game
+        for _ in range(turrets):
+            Turret(self.take(), game.turret_base, game.turret_gun, (game.all_sprites, game.turret_sprites), game.round_bullet_surf,
+                   (game.all_sprites, game.bullet_sprites), game.all_sprites, game.collision_sprites, game.enemy_sprites, game)
+        for _ in range(traps):
+            Trap(self.take(), game.trap_surf, (game.all_sprites, game.trap_sprites), animation_frames=game.trap_frames, game=game)
+        for _ in range(wires):
+            BarbedWire(self.take(), game.barbed_wire_surf, (game.all_sprites, game.trap_sprites), game=game, rotation=self.random.choice((0, 90)))
+
+    def add_enemies(self, count, kind, enemy_class):
+        game = self.game
+        enemies = []
+        for _ in range(count):
+            enemy = enemy_class(self.take(), game.enemy_frames[kind], (game.all_sprites, game.enemy_sprites), game.player, game.collision_sprites, game)
+            enemy.health = SCENE_ENEMY_HEALTH
+            enemies.append(enemy)
+        return enemies
+
+    def restore(self):
+        # undo the last round, enemies walk back to their tiles and spent bullets are fired again
+        game = self.game
+        for enemy, pos in self.start_positions:
+            enemy.hitbox_rect.center = pos
+            enemy.rect.center = pos
+            if enemy.slot is not None:
+                game.enemy_store.pos[enemy.slot] = pos
+
+        missing = len(self.bullet_directions) - len(game.bullet_sprites)
+        origin = pygame.Vector2(game.player.rect.center)
+        for direction in self.bullet_directions[:max(missing, 0)]:
+            game.bullet_pool.acquire(game.bullet_surf, origin, direction, SCENE_BULLET_LIFETIME, game.player,
+                                     (game.all_sprites, game.bullet_sprites), game.collision_sprites, game.enemy_sprites, game)
+
+    def new_frame(self, dt = SIM_DT):
+        # per frame work every entity update relies on, done once by Game.step before the sprites update
+        game = self.game
+        game.frame += 1
+        game.sight.new_frame()
+        game.all_sprites.flush()
+        game.flow_field.update(game.player.rect.center)
+        game.update_enemy_kinematics(dt)
@@ -0,0 +1,130 @@
+from settings import *
+import json
+import os
+
+ATLAS_VERSION = 2
+
+# scale2x first keeps hard pixel edges before the final resample
+SCALE_METHODS = {
+    'scale': pygame.transform.scale,
+    'smoothscale': pygame.transform.smoothscale,
+    'scale2x_scale': lambda surf, size: pygame.transform.scale(pygame.transform.scale2x(surf), size),
+    'scale2x_smoothscale': lambda surf, size: pygame.transform.smoothscale(pygame.transform.scale2x(surf), size),
+}
+
+class AssetManager:
+    '''Loads every image file once and memoises its scaled variants, optionally baked into an atlas'''
+    def __init__(self, cache_dir = ASSET_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.atlas_path = join(cache_dir, 'atlas.png')
+        self.index_path = join(cache_dir, 'atlas.json')
+
+        # (path, size, method) -> surface, size and method are None for the file as loaded
+        self.surfaces = {}
+        # keys handed out to callers, sources only loaded to be rescaled stay out of the atlas
+        self.packed = set()
+        self.sizes = {}
+        self.atlas_loaded = False
+        self.dirty = False
+
+    def load(self, path):
+        # returned surfaces are shared, copy them before drawing on them
+        key = (path, None, None)
+        self.packed.add(key)
+        return self.get(key)
+
+    def scaled(self, path, size, method = 'scale'):
+        key = (path, tuple(size), method)
+        self.packed.add(key)
+        return self.get(key)
+
+    def size_of(self, path):
+        # source size without decoding the file when the atlas already knows it
+        if path not in self.sizes:
+            self.sizes[path] = self.get((path, None, None)).get_size()
+        return self.sizes[path]
+
+    def get(self, key):
+        if not self.atlas_loaded:
+            self.load_atlas()
+
+        surf = self.surfaces.get(key)
+        if surf is None:
+            path, size, method = key
+            if size is None:
+                surf = pygame.image.load(path).convert_alpha()
+                self.sizes[path] = surf.get_size()
+            else:
+                surf = SCALE_METHODS[method](self.get((path, None, None)), size)
+            self.surfaces[key] = surf
+            self.dirty = True
+        return surf
+
+    def load_atlas(self):
+        self.atlas_loaded = True
+        if not BAKE_ASSET_ATLAS:
+            return
+
+        try:
+            with open(self.index_path) as file:
+                index = json.load(file)
+            # any edited or missing source image throws the whole atlas away
+            if index['version'] != ATLAS_VERSION:
+                return
+            for path, mtime in index['sources'].items():
+                if os.path.getmtime(path) != mtime:
+                    return
+            atlas = pygame.image.load(self.atlas_path).convert_alpha()
+        except (OSError, ValueError, KeyError, pygame.error):
+            return
+
+        for path, size in index['sizes'].items():
+            self.sizes[path] = tuple(size)
+        for path, size, method, rect in index['entries']:
+            key = (path, tuple(size) if size else None, method)
+            self.surfaces[key] = atlas.subsurface(rect).copy()
+            self.packed.add(key)
+
+    def save_atlas(self):
+        # shelf pack every surface loaded so far, tallest first
+        if not BAKE_ASSET_ATLAS or not self.dirty:
+            return
+
+        # images wider than the atlas are left out and keep loading from their source files
+        keys = [key for key in self.packed if self.surfaces[key].get_width() <= ASSET_ATLAS_WIDTH]
+        keys.sort(key=lambda key: self.surfaces[key].get_height(), reverse=True)
+        entries = []
+        x = y = shelf_height = 0
+        for key in keys:
+            width, height = self.surfaces[key].get_size()
+            if x + width > ASSET_ATLAS_WIDTH:
+                x, y = 0, y + shelf_height
+                shelf_height = 0
+            path, size, method = key
+            entries.append([path, size, method, [x, y, width, height]])
+            x += width
+            shelf_height = max(shelf_height, height)
+
+        atlas = pygame.Surface((ASSET_ATLAS_WIDTH, max(1, y + shelf_height)), pygame.SRCALPHA)
+        for key, entry in zip(keys, entries):
+            # max blend onto the empty atlas copies the pixels as they are, a normal blit would blend the alpha
+            atlas.blit(self.surfaces[key], entry[3][:2], special_flags=pygame.BLEND_RGBA_MAX)
+
+        sources = {path for path, _, _ in keys}
+        index = {
+            'version': ATLAS_VERSION,
+            'sources': {path: os.path.getmtime(path) for path in sources},
+            'sizes': {path: self.sizes[path] for path in sources if path in self.sizes},
+            'entries': entries,
+        }
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pygame.image.save(atlas, self.atlas_path)
+            with open(self.index_path, 'w') as file:
+                json.dump(index, file)
+        except (OSError, pygame.error):
+            return
+        self.dirty = False
+
+assets = AssetManager()
@@ -1,11 +1,53 @@
 from settings import *
 
+# pre-rotated bullet frames keyed by (base surface, angle step)
+rotation_cache = {}
+
+def rotation_frames(surf, step = BULLET_ROTATION_STEP):
+    key = (surf, step)
+    if key not in rotation_cache:
+        # always rotate the base surface so non-square images do not grow
+        rotation_cache[key] = [pygame.transform.rotate(surf, angle) for angle in range(0, 360, step)]
+    return rotation_cache[key]
+
+class ProjectilePool:
+    '''Keeps killed projectiles so new shots reuse the sprite objects instead of allocating new ones'''
+    def __init__(self, projectile_class):
+        self.projectile_class = projectile_class
+        self.free = []
+
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            projectile = self.free.pop()
+            projectile.reset(*args, **kwargs)
+        else:
+            projectile = self.projectile_class(*args, **kwargs)
+            projectile.pool = self
+        return projectile
+
+    def release(self, projectile):
+        # kill() can run twice in one update, only the first one returns the projectile
+        if projectile.active:
+            projectile.active = False
+            self.free.append(projectile)
+
 class Bullet(pygame.sprite.Sprite):
     def __init__(self, surf, pos, direction, lifetime, shooter, groups, collision_sprites, enemy_sprites, game, speed = BULLET_SPEED):
-        super().__init__(groups)
-        self.image = surf
-        self.rect = self.image.get_frect(center = pos)
-        self.spawn_time = pygame.time.get_ticks()
+        super().__init__()
+        self.pool = None
+        # reset() fills these in place, so a pooled bullet keeps its rects and vector
+        self.rect = pygame.FRect()
+        self.old_rect = pygame.FRect()
+        self.direction = pygame.Vector2()
+        self.reset(surf, pos, direction, lifetime, shooter, groups, collision_sprites, enemy_sprites, game, speed)
+
+    def reset(self, surf, pos, direction, lifetime, shooter, groups, collision_sprites, enemy_sprites, game, speed = BULLET_SPEED):
+        self.frames = rotation_frames(surf)
+        self.frame_index = 0
+        self.image = self.frames[0]
+        width, height = self.image.get_size()
+        self.rect.update(pos[0] - width / 2, pos[1] - height / 2, width, height)
+        self.spawn_time = game.game_clock.get_ticks()
         self.lifetime = lifetime
         self.enemy_sprites = enemy_sprites
         self.game = game
@@ -13,10 +55,18 @@ class Bullet(pygame.sprite.Sprite):
 
         self.hitbox_rect = self.rect
         self.collision_sprites = collision_sprites
-        self.old_rect = self.rect.copy()
+        self.old_rect.update(self.rect)
 
-        self.direction = direction
+        self.direction.update(direction)
         self.speed = speed
+
+        self.active = True
+        self.add(groups)
+
+    def kill(self):
+        super().kill()
+        if self.pool:
+            self.pool.release(self)
     
     def move(self, dt):
         self.rect.x += self.direction.x * self.speed * dt
@@ -26,7 +76,7 @@ class Bullet(pygame.sprite.Sprite):
         # self.rect.center = self.hitbox_rect.center
 
     def collision(self, direction):
-        for sprite in self.collision_sprites:
+        for sprite in self.collision_sprites.query(self.hitbox_rect):
             if sprite.rect.colliderect(self.hitbox_rect):
                 if direction == 'horizontal':
                     if self.rect.right >= sprite.rect.left and self.old_rect.right <= sprite.old_rect.left:
@@ -53,7 +103,7 @@ class Bullet(pygame.sprite.Sprite):
                     break
 
     def update(self, dt):
-        self.old_rect = self.rect.copy()
+        self.old_rect.update(self.rect)
         # self.rect.center += self.direction * self.speed * dt
         self.move(dt)
         self.animate()
@@ -61,23 +111,38 @@ class Bullet(pygame.sprite.Sprite):
 
         self.check_enemy_hit()
 
-        if pygame.time.get_ticks() - self.spawn_time >= self.lifetime:
+        if self.game.game_clock.get_ticks() - self.spawn_time >= self.lifetime:
             self.kill()
 
     def animate(self):
-        self.image = pygame.transform.rotate(self.image, 90)
+        self.frame_index = (self.frame_index + 1) % len(self.frames)
+        self.image = self.frames[self.frame_index]
 
 class RockProjectile(pygame.sprite.Sprite):
     def __init__(self, pos, direction, game):
-        super().__init__(game.all_sprites, game.bullet_sprites)
+        super().__init__()
+        self.pool = None
+        self.rect = pygame.FRect()
+        self.direction = pygame.Vector2()
+        self.reset(pos, direction, game)
+
+    def reset(self, pos, direction, game):
         self.game = game
-        self.image = pygame.image.load(join('images', 'boss', 'rock.png')).convert_alpha()
-        self.image = pygame.transform.scale(self.image, (64,64))
-        self.rect = self.image.get_frect(center=pos)
-        self.direction = direction
+        self.image = game.rock_surf
+        width, height = self.image.get_size()
+        self.rect.update(pos[0] - width / 2, pos[1] - height / 2, width, height)
+        self.direction.update(direction)
         self.speed = 350
         self.lifetime = 2000
-        self.spawn = pygame.time.get_ticks()
+        self.spawn = self.game.game_clock.get_ticks()
+
+        self.active = True
+        self.add(game.all_sprites, game.bullet_sprites)
+
+    def kill(self):
+        super().kill()
+        if self.pool:
+            self.pool.release(self)
 
     def update(self, dt):
         self.rect.center += self.direction * self.speed * dt
@@ -86,5 +151,5 @@ class RockProjectile(pygame.sprite.Sprite):
             self.game.player.take_hit(self.game, BOSS_ROCK_DAMAGE)
             self.kill()
         
-        if pygame.time.get_ticks() - self.spawn > self.lifetime:
+        if self.game.game_clock.get_ticks() - self.spawn > self.lifetime:
             self.kill()
\ No newline at end of file
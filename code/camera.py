@@ -0,0 +1,26 @@
+from settings import *
+
+class RenderTarget:
+    '''Camera surfaces reused per zoom level, scaled in place onto the window'''
+    def __init__(self, display_surface, cache_size = CAMERA_SURFACE_CACHE_SIZE):
+        self.display_surface = display_surface
+        self.cache_size = cache_size
+        self.surfaces = {}
+
+    def camera_surface(self, width, height):
+        # at 1:1 the world is drawn straight onto the window, no scaling pass needed
+        if (width, height) == self.display_surface.get_size():
+            return self.display_surface
+
+        surface = self.surfaces.pop((width, height), None)
+        if surface is None:
+            surface = pygame.Surface((width, height))
+            # drop the least recently used size, smooth zooming passes through many of them
+            if len(self.surfaces) >= self.cache_size:
+                del self.surfaces[next(iter(self.surfaces))]
+        self.surfaces[(width, height)] = surface
+        return surface
+
+    def present(self, camera_surface):
+        if camera_surface is not self.display_surface:
+            pygame.transform.scale(camera_surface, self.display_surface.get_size(), self.display_surface)
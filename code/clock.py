@@ -0,0 +1,11 @@
+class GameClock:
+    '''Simulated time in milliseconds, only moves when the game steps so pauses and fast runs stay consistent'''
+    def __init__(self, start = 0):
+        self.time = start
+
+    def advance(self, dt):
+        self.time += dt * 1000
+
+    def get_ticks(self):
+        # same units as pygame.time.get_ticks so timers can swap one for the other
+        return int(self.time)
@@ -0,0 +1,64 @@
+from settings import *
+
+class Controls:
+    '''Live keyboard and mouse input'''
+    def events(self):
+        return pygame.event.get()
+
+    def keys(self):
+        return pygame.key.get_pressed()
+
+    def mouse_buttons(self):
+        return pygame.mouse.get_pressed()
+
+    def mouse_pos(self):
+        return pygame.mouse.get_pos()
+
+class HeldKeys(set):
+    '''Set of held keys that can be indexed like pygame.key.get_pressed()'''
+    def __getitem__(self, key):
+        return key in self
+
+class ScriptedControls(Controls):
+    '''Input injected by a script instead of read from the keyboard and mouse, used by headless runs'''
+    def __init__(self):
+        self.held = HeldKeys()
+        self.buttons = [False, False, False]
+        self.pos = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+        self.queue = []
+
+    def events(self):
+        events, self.queue = self.queue, []
+        return events
+
+    def keys(self):
+        return self.held
+
+    def mouse_buttons(self):
+        return tuple(self.buttons)
+
+    def mouse_pos(self):
+        return self.pos
+
+    def press(self, key):
+        self.held.add(key)
+        self.queue.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+    def release(self, key):
+        self.held.discard(key)
+        self.queue.append(pygame.event.Event(pygame.KEYUP, key=key))
+
+    def tap(self, key):
+        self.press(key)
+        self.release(key)
+
+    def move_mouse(self, pos):
+        self.pos = (int(pos[0]), int(pos[1]))
+
+    def hold_mouse(self, held = True, button = 1):
+        self.buttons[button - 1] = held
+
+    def click(self, pos, button = 1):
+        self.move_mouse(pos)
+        self.queue.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=self.pos, button=button))
+        self.queue.append(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=self.pos, button=button))
@@ -1,15 +1,51 @@
 from settings import *
-from bullet import Bullet, RockProjectile
+from swarm import DEAD
+
+class EnemyFrames:
+    '''Every variant of an enemy's animation frames, baked once so enemies never build surfaces at runtime'''
+    def __init__(self, frames):
+        self.frames = frames
+        self.masks = {}
+        self.flash = {}
+        self.death = {}
+
+        for direction, surfs in frames.items():
+            self.masks[direction] = []
+            self.flash[direction] = []
+            self.death[direction] = []
+            for surf in surfs:
+                mask = pygame.mask.from_surface(surf)
+
+                # red tint while the enemy is hit
+                overlay = mask.to_surface(setcolor=(255,0,0,100), unsetcolor=(0,0,0,0))
+                overlay.set_colorkey((0,0,0))
+                flash = surf.copy()
+                flash.blit(overlay, (0,0))
+
+                # white silhouette when the enemy dies
+                death = mask.to_surface()
+                death.set_colorkey('black')
+
+                self.masks[direction].append(mask)
+                self.flash[direction].append(flash)
+                self.death[direction].append(death)
+
+    def __getitem__(self, direction):
+        return self.frames[direction]
 
 class Enemy(pygame.sprite.Sprite):
+    flying = False
+
     def __init__(self, pos, frames, groups, player, collision_sprites, game):
         super().__init__(groups)
+        # row in the game's enemy store, None when enemies update per sprite
+        self.slot = None
         self.player = player
         self.health = ENEMY_HEALTH
         self.game = game
 
         # destroy enemy after 20 seconds
-        self.spawn_time = pygame.time.get_ticks()
+        self.spawn_time = self.game.game_clock.get_ticks()
         self.lifetime = ENEMY_DESPAWN_TIME
 
         self.frames = frames
@@ -37,14 +73,42 @@ class Enemy(pygame.sprite.Sprite):
         self.flash_start_time = 0
         
         self.is_flashing = False
-        self.mask = pygame.mask.from_surface(self.image)
-        self.original_image = self.image.copy()
+        self.mask = self.frames.masks[self.direction_state][self.frame_index]
 
         # pathfinding
         self.move_dir = pygame.Vector2(0,1)
-        self.last_pos = pygame.Vector2(self.rect.center)
-        self.stuck_timer = 0
-        self.stuck_threshold = 200
+
+        if game.enemy_store:
+            self.slot = game.enemy_store.add(self.hitbox_rect.center, self.speed, self.health, self.flying)
+
+    # health and speed live in the enemy store while the enemy has a slot
+    @property
+    def health(self):
+        return self._health if self.slot is None else float(self.game.enemy_store.health[self.slot])
+
+    @health.setter
+    def health(self, value):
+        if self.slot is None:
+            self._health = value
+        else:
+            self.game.enemy_store.health[self.slot] = value
+
+    @property
+    def speed(self):
+        return self._speed if self.slot is None else float(self.game.enemy_store.speed[self.slot])
+
+    @speed.setter
+    def speed(self, value):
+        if self.slot is None:
+            self._speed = value
+        else:
+            self.game.enemy_store.speed[self.slot] = value
+
+    def kill(self):
+        if self.slot is not None:
+            self._speed, self._health = self.game.enemy_store.remove(self.slot)
+            self.slot = None
+        super().kill()
 
     def animate(self, dt):
         frames = self.frames[self.direction_state]
@@ -52,9 +116,7 @@ class Enemy(pygame.sprite.Sprite):
         self.frame_index += self.animation_speed * dt
         self.frame_index %= len(frames)
         self.image = frames[int(self.frame_index)]
-
-        self.original_image = self.image.copy()
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = self.frames.masks[self.direction_state][int(self.frame_index)]
 
     def update_direction_state(self):
         dx, dy = self.direction.x, self.direction.y
@@ -72,46 +134,27 @@ class Enemy(pygame.sprite.Sprite):
 
     def has_line_of_sight(self):
         # returns true if there is no wall between the player and the enemy
-        start = pygame.Vector2(self.rect.center)
-        end = pygame.Vector2(self.player.rect.center)
-        direction = end - start
-        dist = direction.length()
-
-        if dist == 0:
-            return True
-
-        direction = direction.normalize()
-        step = 3  # pixels per step
-        steps = int(dist // step)
-
-        probe = start.copy()
-        for _ in range(steps):
-            probe += direction * step
-            for sprite in self.collision_sprites:
-                if sprite.rect.collidepoint(probe):
-                    return False
-        return True
+        return self.game.sight.has_line_of_sight(self.rect.center, self.player.rect.center)
 
     def move(self, dt):
-        # convert dt to ms because stuck_timer uses ms
-        dt_ms = dt * 1000
-
-        # get direction to player
-        to_player = pygame.Vector2(self.player.rect.center) - pygame.Vector2(self.rect.center)
-        if to_player.length() > 0:
-            to_player = to_player.normalize()
+        # follow the flow field around the walls when the player is out of sight, the field only covers
+        # the player's room, so enemies outside it or standing in a blocked cell chase the player directly
+        # and slide along whatever wall is in the way
+        flow_dir = None
+        if not self.has_line_of_sight():
+            flow_dir = self.game.flow_field.direction_at(self.rect.center)
+
+        if flow_dir:
+            self.move_dir = flow_dir
         else:
-            to_player = pygame.Vector2(0, 1)
-
-        # if no object between player and enemy, move to player
-        if self.has_line_of_sight():
-            self.move_dir = to_player
-            self.stuck_timer = 0  # reset stuck timer when we see the player
+            if self.slot is not None:
+                to_player = pygame.Vector2(self.game.enemy_store.directions[self.slot])
+            else:
+                to_player = pygame.Vector2(self.player.rect.center) - pygame.Vector2(self.rect.center)
+            if to_player.length() > 0:
+                self.move_dir = to_player.normalize()
 
-        # try moving to current direction
         self.direction = self.move_dir
-        # store position before trying to move to measure movement
-        before = pygame.Vector2(self.rect.center)
 
         # actual movement
         self.hitbox_rect.centerx += self.direction.x * self.speed * dt
@@ -120,24 +163,11 @@ class Enemy(pygame.sprite.Sprite):
         self.collisions('vertical')
         self.rect.center = self.hitbox_rect.center
 
-        # detect if enemy is stuck by checking how much it moved
-        moved_dist = (pygame.Vector2(self.rect.center) - before).length()
-        if moved_dist < 0.5:      # not moving (blocked)
-            self.stuck_timer += dt_ms
-        else:
-            self.stuck_timer = 0  # moving again
-
-        # if enemy is stuck and has not line of sight to player, rotate direction by 90 degrees and try moving again
-        if self.stuck_timer >= self.stuck_threshold and not self.has_line_of_sight():
-            # rotate movement direction by 90 degrees
-            if self.move_dir.length() == 0:
-                self.move_dir = to_player  # fallback
-            self.move_dir = self.move_dir.rotate(90)
-            self.stuck_timer = 0  # reset timer after changing direction
+        if self.slot is not None:
+            self.game.enemy_store.pos[self.slot] = self.hitbox_rect.center
 
     def collisions(self, direction):
-        nearby_sprites = [s for s in self.collision_sprites if s.rect.colliderect(self.hitbox_rect.inflate(32,32))]
-        for sprite in nearby_sprites:
+        for sprite in self.collision_sprites.query(self.hitbox_rect):
             if sprite.rect.colliderect(self.hitbox_rect):
                 if direction == 'horizontal':
                     if self.direction.x > 0: self.hitbox_rect.right = sprite.rect.left
@@ -150,16 +180,10 @@ class Enemy(pygame.sprite.Sprite):
         self.health -= damage
 
         self.is_flashing = True
-        self.flash_start_time = pygame.time.get_ticks()
+        self.flash_start_time = self.game.game_clock.get_ticks()
 
         if self.health <= 0:
             # death 'animation' by flashing enemy in white before dying
-            current_frames = self.frames[self.direction_state]
-            current_frame = current_frames[int(self.frame_index)]
-
-            surf = pygame.mask.from_surface(current_frame).to_surface()
-            surf.set_colorkey('white')
-            self.image = surf
             self.destroy()
             if game:
                 game.money += ENEMY_KILL_MONEY_REWARD
@@ -172,25 +196,30 @@ class Enemy(pygame.sprite.Sprite):
     def destroy(self):
         '''When enemy gets killed apply 'damage' effect '''
         # start a timer
-        self.death_time = pygame.time.get_ticks()
+        self.death_time = self.game.game_clock.get_ticks()
+        if self.slot is not None:
+            self.game.enemy_store.state[self.slot] = DEAD
         # change the image
-        current_frames = self.frames[self.direction_state]
-        current_frame = current_frames[int(self.frame_index)]
+        self.image = self.frames.death[self.direction_state][int(self.frame_index)]
 
-        surf = pygame.mask.from_surface(current_frame).to_surface()
-        surf.set_colorkey('black')
-        self.image = surf
+    def flash(self, now):
+        if self.is_flashing:
+            if now - self.flash_start_time <= self.flash_duration:
+                self.image = self.frames.flash[self.direction_state][int(self.frame_index)]
+            else:
+                self.is_flashing = False
+                self.image = self.frames[self.direction_state][int(self.frame_index)]
 
     def death_timer(self):
-        if pygame.time.get_ticks() - self.death_time >= self.death_duration:
+        if self.game.game_clock.get_ticks() - self.death_time >= self.death_duration:
             self.kill()
 
     def despawn(self):
-        if pygame.time.get_ticks() - self.spawn_time >= self.lifetime:
+        if self.game.game_clock.get_ticks() - self.spawn_time >= self.lifetime:
             self.kill()
 
     def update(self, dt):
-        now = pygame.time.get_ticks()
+        now = self.game.game_clock.get_ticks()
 
         if self.death_time == 0:
             self.move(dt)
@@ -200,17 +229,12 @@ class Enemy(pygame.sprite.Sprite):
             self.death_timer()
         # self.despawn()
         
-        if self.is_flashing:
-            if now - self.flash_start_time <= self.flash_duration:
-                mask_surf = self.mask.to_surface(setcolor=(255,0,0,100), unsetcolor=(0,0,0,0))
-                mask_surf.set_colorkey((0,0,0))
-                self.image = self.original_image.copy()
-                self.image.blit(mask_surf, (0,0))
-            else:
-                self.is_flashing = False
-                self.image = self.original_image
+        self.flash(now)
 
 class FlyingEnemy(Enemy):
+    flying = True
+    render_layer = 'flying'
+
     def __init__(self, pos, frames, groups, player, collision_sprites, game):
         super().__init__(pos, frames, groups, player, collision_sprites, game)
         self.speed = ENEMY_SPEED * 1.2
@@ -218,19 +242,31 @@ class FlyingEnemy(Enemy):
         self.game = game
 
     def move(self, dt):
+        # the enemy store already worked out chase and separation for this frame
+        if self.slot is not None:
+            store = self.game.enemy_store
+            self.direction.update(store.directions[self.slot])
+            vel_x, vel_y = store.velocities[self.slot]
+            self.hitbox_rect.x += vel_x * dt
+            self.hitbox_rect.y += vel_y * dt
+            self.rect.center = self.hitbox_rect.center
+            store.pos[self.slot] = self.hitbox_rect.center
+            return
+
         # get direction
         player_pos = pygame.Vector2(self.player.rect.center)
         enemy_pos = pygame.Vector2(self.rect.center)
         self.direction = (player_pos - enemy_pos).normalize()
 
+        # only enemies in the neighbouring cells can be inside the separation radius
         separation = pygame.Vector2(0,0)
-        for other in self.game.enemy_sprites:
+        for other in self.game.enemy_index.nearby(enemy_pos):
             if other == self:
                 continue
-            offset = pygame.Vector2(self.rect.center) - pygame.Vector2(other.rect.center)
+            offset = enemy_pos - other.rect.center
             distance = offset.length()
-            if distance < 20 and distance > 0:
-                separation += offset.normalize() * (20 - distance)
+            if distance < FLYING_SEPARATION_RADIUS and distance > 0:
+                separation += offset.normalize() * (FLYING_SEPARATION_RADIUS - distance)
         
         move_vector = self.direction * self.speed * dt + separation * dt
         self.hitbox_rect.center += move_vector
@@ -256,7 +292,7 @@ class Skeleton(Enemy):
         self.damage = ENEMY_DAMAGE
 
     def attack(self):
-        now = pygame.time.get_ticks()
+        now = self.game.game_clock.get_ticks()
         if not self.is_shooting and now - self.last_attack_time >= self.attack_cooldown:
             self.is_shooting = True
             self.shoot_start_time = now
@@ -270,7 +306,7 @@ class Skeleton(Enemy):
             if direction.length() != 0:
                 direction = direction.normalize()
             
-            Bullet(
+            self.game.bullet_pool.acquire(
                 surf=self.game.bone_bullet,
                 pos=self.rect.center,
                 direction=direction,
@@ -283,7 +319,7 @@ class Skeleton(Enemy):
                 speed=BULLET_SPEED * 0.75)
     
     def update(self, dt):
-        now = pygame.time.get_ticks()
+        now = self.game.game_clock.get_ticks()
 
         if self.death_time == 0:
             if self.is_shooting:
@@ -298,15 +334,7 @@ class Skeleton(Enemy):
         else:
             self.death_timer()
 
-        if self.is_flashing:
-            if now - self.flash_start_time <= self.flash_duration:
-                mask_surf = self.mask.to_surface(setcolor=(255,0,0,100), unsetcolor=(0,0,0,0))
-                mask_surf.set_colorkey((0,0,0))
-                self.image = self.original_image.copy()
-                self.image.blit(mask_surf, (0,0))
-            else:
-                self.is_flashing = False
-                self.image = self.original_image
+        self.flash(now)
 
 class Boss(Enemy):
     def __init__(self, pos, idle_frames, throw_frames, smash_frames, groups, player, collision_sprites, game):
@@ -322,7 +350,7 @@ class Boss(Enemy):
 
         self.state = 'idle'
         self.throw_cooldown = 5000 # ms
-        self.last_throw = pygame.time.get_ticks()
+        self.last_throw = self.game.game_clock.get_ticks()
         self.idle_frames = idle_frames
         self.throw_frames = throw_frames
         self.smash_frames = smash_frames
@@ -335,7 +363,7 @@ class Boss(Enemy):
         self.smash_anim_speed = 0.05
         self.smash_cooldown = SMASH_COOLDOWN
         
-        self.last_smash = pygame.time.get_ticks()
+        self.last_smash = self.game.game_clock.get_ticks()
 
         self.smash_cone_angle = SMASH_ANGLE
         self.smash_cone_range = SMASH_RANGE
@@ -379,7 +407,7 @@ class Boss(Enemy):
 
     def idle_update(self, dt):
         super().update(dt)
-        now = pygame.time.get_ticks()
+        now = self.game.game_clock.get_ticks()
         self.has_smashed = False
         self.has_thrown = False
 
@@ -421,7 +449,7 @@ class Boss(Enemy):
         player_pos = pygame.Vector2(self.player.rect.center)
         boss_pos = pygame.Vector2(self.rect.center)
         direction = (player_pos - boss_pos).normalize()
-        RockProjectile(self.rect.center, direction, self.game)
+        self.game.rock_pool.acquire(self.rect.center, direction, self.game)
 
     def throw_recover_update(self, dt):
         dir_name = self.get_dir_name()
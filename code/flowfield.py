@@ -0,0 +1,86 @@
+from settings import *
+from heapq import heappush, heappop
+
+# (dx, dy, cost) for the eight neighbours, diagonals cost ~sqrt(2)
+NEIGHBOURS = [(1, 0, 10), (-1, 0, 10), (0, 1, 10), (0, -1, 10), (1, 1, 14), (1, -1, 14), (-1, 1, 14), (-1, -1, 14)]
+
+class FlowField:
+    '''Dijkstra field toward the player's tile, shared by every ground enemy in the player's room'''
+    def __init__(self, grid):
+        self.grid = grid
+        self.target = None
+        self.room = None
+        self.weights = {}
+        self.next_cell = {}
+        self.dirty = True
+
+    def invalidate(self):
+        self.dirty = True
+
+    def update(self, target_pos):
+        # only recompute when the player changes tile or a structure changed the room
+        target = self.grid.cell_at(target_pos)
+        if target == self.target and not self.dirty:
+            return
+
+        room = (target[0] // self.grid.cols, target[1] // self.grid.rows)
+        if self.dirty or room != self.room:
+            self.room = room
+            self.weights = self.room_weights(room)
+
+        self.target = target
+        self.dirty = False
+        self.compute(target)
+
+    def room_weights(self, room):
+        # extra cost of entering each walkable cell, tiles next to a wall cost more so enemies keep off corners
+        grid = self.grid
+        left, top = room[0] * grid.cols, room[1] * grid.rows
+        weights = {}
+
+        for cx in range(left, left + grid.cols):
+            for cy in range(top, top + grid.rows):
+                if grid.blocked(cx, cy):
+                    continue
+                near_wall = any(grid.blocked(cx + dx, cy + dy) for dx, dy, _ in NEIGHBOURS)
+                weights[(cx, cy)] = FLOW_WALL_PENALTY if near_wall else 0
+        return weights
+
+    def compute(self, target):
+        weights = self.weights
+        cost = {target: 0}
+        next_cell = {}
+        heap = [(0, target)]
+
+        while heap:
+            dist, cell = heappop(heap)
+            if dist > cost[cell]:
+                continue
+
+            cx, cy = cell
+            for dx, dy, step in NEIGHBOURS:
+                neighbour = (cx + dx, cy + dy)
+                weight = weights.get(neighbour)
+                if weight is None:
+                    continue
+                # do not cut diagonally past a wall corner
+                if dx and dy and ((cx + dx, cy) not in weights or (cx, cy + dy) not in weights):
+                    continue
+
+                new_dist = dist + step + weight
+                if neighbour not in cost or new_dist < cost[neighbour]:
+                    cost[neighbour] = new_dist
+                    next_cell[neighbour] = cell
+                    heappush(heap, (new_dist, neighbour))
+
+        self.next_cell = next_cell
+
+    def direction_at(self, pos):
+        # direction toward the next cell on the way to the player, None outside the field
+        cell = self.next_cell.get(self.grid.cell_at(pos))
+        if cell is None:
+            return None
+
+        cs = self.grid.cell_size
+        direction = pygame.Vector2((cell[0] + 0.5) * cs - pos[0], (cell[1] + 0.5) * cs - pos[1])
+        return direction.normalize() if direction else None
@@ -0,0 +1,32 @@
+from settings import *
+from collections import OrderedDict
+
+class FontCache:
+    '''Font registry plus an lru of rendered text keyed by (font, size, text, colour)'''
+    def __init__(self, capacity = TEXT_CACHE_SIZE):
+        self.capacity = capacity
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        # text surfaces rendered so far, cache misses only
+        self.renders = 0
+
+    def get(self, size, path = FONT_PATH):
+        font = self.fonts.get((path, size))
+        if font is None:
+            font = self.fonts[(path, size)] = pygame.font.Font(path, size)
+        return font
+
+    def render(self, text, size, color, path = FONT_PATH):
+        # returned surfaces are shared, copy them before drawing on them
+        key = (path, size, text, color)
+        surf = self.surfaces.get(key)
+        if surf is None:
+            surf = self.surfaces[key] = self.get(size, path).render(text, True, color)
+            self.renders += 1
+            if len(self.surfaces) > self.capacity:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surf
+
+fonts = FontCache()
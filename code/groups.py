@@ -1,8 +1,114 @@
-from settings import * 
+from settings import *
 from turret import Turret
+from sprites import Bomb
+from player import Player
+from spatial import SpatialHash
+from pending import PendingSprites
+
+# sprite layers in draw order, the y sorted ones keep their order between frames
+SPRITE_LAYERS = ['ground', 'trap', 'object', 'flying']
+SORTED_LAYERS = ['ground', 'object']
+
+def sort_key(sprite):
+    return sprite.rect.centery
 
 class AllSprites(pygame.sprite.Group):
     def __init__(self):
         super().__init__()
         self.display_surface = pygame.display.get_surface()
-        self.offset = pygame.Vector2()
\ No newline at end of file
+        self.offset = pygame.Vector2()
+
+        # render layers in draw order, sprites that left the group are dropped on the next flush
+        self.layers = {layer: [] for layer in SPRITE_LAYERS}
+        self.sprite_layers = {}
+        self.stale = set()
+        self.pending = PendingSprites(self.place)
+
+        # per-room update sets, kept in step with the group when a scheduler is attached
+        self.scheduler = None
+
+    def add_internal(self, sprite, layer = None):
+        super().add_internal(sprite, layer)
+        self.pending.add(sprite)
+        if self.scheduler:
+            self.scheduler.add(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if self.scheduler:
+            self.scheduler.remove(sprite)
+        # pooled sprites leave and rejoin constantly, so removal only drops the membership
+        layer = self.sprite_layers.pop(sprite, None)
+        if layer:
+            self.stale.add(layer)
+        else:
+            self.pending.discard(sprite)
+
+    def place(self, sprite):
+        layer = getattr(sprite, 'render_layer', None)
+        if layer is None:
+            layer = 'ground' if getattr(sprite, 'ground', False) else 'object'
+
+        self.sprite_layers[sprite] = layer
+        self.layers[layer].append(sprite)
+
+    def flush(self):
+        self.pending.flush()
+        for layer in self.stale:
+            self.compact(layer)
+        self.stale.clear()
+
+    def compact(self, layer):
+        # drop sprites that left the group, and the old entry of sprites that left and came back
+        seen = set()
+        self.layers[layer] = [sprite for sprite in self.layers[layer]
+                              if self.sprite_layers.get(sprite) == layer and not (sprite in seen or seen.add(sprite))]
+
+    def draw(self, surface):
+        self.flush()
+
+        # sprites only move a little each frame and new ones are appended at the end,
+        # so the list stays nearly sorted and the in place sort is close to linear
+        for layer in SORTED_LAYERS:
+            self.layers[layer].sort(key=sort_key)
+
+        for layer in SPRITE_LAYERS:
+            for sprite in self.layers[layer]:
+                draw_pos = sprite.rect.topleft + self.offset
+
+                if isinstance(sprite, Turret):
+                    sprite.draw(surface, self.offset)
+                elif isinstance(sprite, Bomb):
+                    sprite.draw_countdown(surface, self.offset)
+                elif isinstance(sprite, Player):
+                    sprite.draw(surface, pygame.Rect(draw_pos, sprite.rect.size))
+                else:
+                    surface.blit(sprite.image, draw_pos)
+
+class CollisionSprites(pygame.sprite.Group):
+    '''Collision group with a spatial hash so movers only test nearby walls'''
+    def __init__(self, cell_size = COLLISION_CELL_SIZE):
+        super().__init__()
+        self.grid = SpatialHash(cell_size)
+        # hashed on the next query
+        self.pending = PendingSprites(self.grid.insert)
+
+    def add_internal(self, sprite, layer = None):
+        super().add_internal(sprite, layer)
+        self.pending.add(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.pending.discard(sprite)
+        self.grid.remove(sprite)
+
+    def rebuild(self):
+        self.grid.clear()
+        self.pending.clear()
+        for sprite in self.sprites():
+            self.grid.insert(sprite)
+
+    def query(self, rect):
+        if self.pending:
+            self.pending.flush()
+        return self.grid.query(rect)
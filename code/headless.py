@@ -0,0 +1,140 @@
+'''Headless simulation runs for balance testing and sim throughput.
+
+Run from the repo root: python code/headless.py --waves 3 --turrets 4 --boss
+'''
+from settings import *
+from main import Game
+from profiler import profiler
+from time import perf_counter
+import argparse
+import random
+
+def screen_pos(game, world_pos):
+    # inverse of Game.get_mouse_pos, where the mouse has to be to point at world_pos
+    x = (world_pos[0] - game.camera_pos.x) * WINDOW_WIDTH / game.camera_width
+    y = (world_pos[1] - game.camera_pos.y) * WINDOW_HEIGHT / game.camera_height
+    return x, y
+
+def auto_aim(game):
+    # hold the fire button on the nearest enemy
+    enemies = game.enemy_sprites.sprites()
+    if not enemies:
+        game.controls.hold_mouse(False)
+        return
+
+    player_pos = pygame.Vector2(game.player.rect.center)
+    target = min(enemies, key=lambda enemy: player_pos.distance_squared_to(enemy.rect.center))
+    # Game.input cannot shoot at its own position, keep the last aim when the target is on top of the player
+    if player_pos.distance_squared_to(target.rect.center) >= 1:
+        game.controls.move_mouse(screen_pos(game, target.rect.center))
+    game.controls.hold_mouse(True)
+
+def place_turrets(game, count, radius = 48):
+    # select the turret slot, click spots in a ring around the player and leave build mode again
+    controls = game.controls
+    controls.tap(pygame.K_1)
+    for i in range(count):
+        pos = pygame.Vector2(game.player.rect.center) + pygame.Vector2(radius, 0).rotate(360 * i / count)
+        controls.click(screen_pos(game, pos))
+    controls.tap(pygame.K_e)
+    game.step(SIM_DT, controls.events())
+
+def enter_room(game, grid):
+    # put the player on the free tile closest to the room center
+    game.update_realised_rooms(grid)
+    room = game.rooms[grid]
+    px, py = game.room_positions[grid]
+    grid_map = game.occupancy
+    center = grid_map.cell_at((px + room.width * TILE_SIZE / 2, py + room.height * TILE_SIZE / 2))
+
+    cells = [(center[0] + dx, center[1] + dy) for dx in range(-8, 9) for dy in range(-8, 9)]
+    cells.sort(key=lambda cell: (cell[0] - center[0]) ** 2 + (cell[1] - center[1]) ** 2)
+    for cx, cy in cells:
+        if not any(grid_map.blocked(cx + dx, cy + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+            pos = ((cx + 0.5) * TILE_SIZE, (cy + 0.5) * TILE_SIZE)
+            break
+    else:
+        pos = grid_map.cell_at(center)
+
+    game.player.hitbox_rect.center = pos
+    game.player.rect.center = pos
+    game.camera_pos.update(px, py)
+    game.camera_target.update(px, py)
+
+def simulate(game, seconds, dt = SIM_DT, script = None, until = None):
+    # fixed timestep steps until the time runs out, the player dies, the boss falls or until() is true
+    frames = 0
+    while frames * dt < seconds:
+        if script:
+            script(game)
+        game.step(dt, game.controls.events())
+        frames += 1
+        if game.player.health <= 0 or game.state == 'victory' or (until and until(game)):
+            break
+    return frames
+
+def snapshot(game, name, frames, elapsed):
+    outcome = 'victory' if game.state == 'victory' else 'dead' if game.player.health <= 0 else 'alive'
+    return {'name': name, 'frames': frames, 'elapsed': elapsed, 'kills': game.kills, 'health': game.player.health, 'money': game.money, 'outcome': outcome}
+
+def run(seed = 0, waves = 1, turrets = 0, seconds = 60, boss = False, dt = SIM_DT):
+    random.seed(seed)
+    game = Game(headless = True)
+    results = []
+
+    for grid in game.rooms:
+        room = game.rooms[grid]
+        if room.is_start:
+            continue
+
+        enter_room(game, grid)
+        if turrets:
+            place_turrets(game, turrets)
+
+        for wave in range(waves):
+            # a new wave spawns on the next step once the room forgets the last one
+            room.enemies_spawned = False
+            start = perf_counter()
+            frames = simulate(game, seconds, dt, auto_aim, lambda game: room.enemies_spawned and not any(enemy.alive() for enemy in room.enemies))
+            results.append(snapshot(game, f'room {grid} wave {wave + 1}', frames, perf_counter() - start))
+            if game.player.health <= 0:
+                return results
+
+    if boss:
+        game.enter_boss_room()
+        game.boss_room.loot_spawned = True
+        start = perf_counter()
+        frames = simulate(game, seconds * 5, dt, auto_aim)
+        results.append(snapshot(game, 'boss', frames, perf_counter() - start))
+
+    return results
+
+def report(results, dt = SIM_DT):
+    total_frames = total_time = 0
+    for result in results:
+        total_frames += result['frames']
+        total_time += result['elapsed']
+        print(f"{result['name']:<24} {result['frames'] * dt:7.1f}s sim  {result['frames'] / max(result['elapsed'], 1e-9):8.0f} steps/s  "
+              f"kills {result['kills']:3}  health {result['health']}  money {result['money']}")
+
+    if results:
+        print(f"{results[-1]['outcome']}: {total_frames} steps in {total_time:.2f}s, {total_frames * dt / max(total_time, 1e-9):.1f}x real time")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the game without a window as fast as the cpu allows')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--waves', type=int, default=1, help='enemy waves spawned per room')
+    parser.add_argument('--turrets', type=int, default=0, help='turrets placed around the player in every room')
+    parser.add_argument('--seconds', type=float, default=60, help='simulated time limit per wave')
+    parser.add_argument('--boss', action='store_true', help='fight the boss after the rooms')
+    parser.add_argument('--profile', metavar='TRACE', help='print per section timings and write a chrome trace of the last frames')
+    args = parser.parse_args()
+
+    if args.profile:
+        profiler.start_trace()
+    report(run(args.seed, args.waves, args.turrets, args.seconds, args.boss))
+
+    if args.profile:
+        for group, name, *values in profiler.report():
+            print(f'{group:<8} {name:<24}' + ''.join(f'{value:8.3f}' for value in values) + ' ms (p50 p95 p99)')
+        print('trace written to', profiler.stop_trace(args.profile))
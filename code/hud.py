@@ -1,9 +1,11 @@
 from settings import *
+from assets import assets
+from fonts import fonts
 
 class HUD:
     def __init__(self, game):
         self.game = game
-        self.font = pygame.font.Font(FONT_PATH, 18)
+        self.font_size = 18
         self.hotbar_slots = ['Turret', 'Wire', 'Trap', 'Bomb']
         self.slot_costs = [TURRET_COST, BARBED_WIRE_COST, TRAP_COST, BOMB_COST]
         self.selected_slot = 0
@@ -14,13 +16,10 @@ class HUD:
         # health bar settigns
         self.heart_spacing = 5
 
-        self.heart_image = pygame.image.load(join('images', 'health', 'heart.png')).convert_alpha()
-        self.heart_bg = pygame.image.load(join('images', 'health', 'background.png')).convert_alpha()
-        self.heart_border = pygame.image.load(join('images', 'health', 'border.png')).convert_alpha()
+        self.heart_image = assets.scaled(join('images', 'health', 'heart.png'), (50,50))
+        self.heart_bg = assets.scaled(join('images', 'health', 'background.png'), (50,50))
+        self.heart_border = assets.scaled(join('images', 'health', 'border.png'), (50,50))
 
-        self.heart_image = pygame.transform.scale(self.heart_image, (50,50))
-        self.heart_bg = pygame.transform.scale(self.heart_bg, (50,50))
-        self.heart_border = pygame.transform.scale(self.heart_border, (50,50))
 
         self.heart_width = self.heart_image.get_width()
         self.heart_height = self.heart_image.get_height()
@@ -53,7 +52,10 @@ class HUD:
         self.room_color = (100, 200, 255, 180)
         self.player_color = (255, 50, 50)
 
-        self.boss_icon = pygame.image.load(join('images','boss','boss_icon.png'))
+        self.boss_icon = assets.load(join('images','boss','boss_icon.png'))
+
+        # static hud layers by name, (state, surface, pos)
+        self.layers = {}
     
     def phase_progress_bar(self, surface, color, font_color, ratio, msg):
         bar_width = 300
@@ -63,66 +65,89 @@ class HUD:
         
         pygame.draw.rect(surface, (80,80,80), (x, y, bar_width, bar_height))
         pygame.draw.rect(surface, color, (x, y, bar_width * ratio, bar_height))
-        wave_text = self.font.render(msg, True, font_color)
+        wave_text = fonts.render(msg, self.font_size, font_color)
         surface.blit(wave_text, (x, y - 15))
 
+    def layer(self, name, state, render):
+        # cached (surface, pos) of a static part of the hud, rendered again only when its state changes
+        cached = self.layers.get(name)
+        if cached is None or cached[0] != state:
+            cached = self.layers[name] = (state, *render())
+        return cached[1], cached[2]
+
+    def compose(self, layer, image, pos):
+        # layers are kept premultiplied so they blend onto the screen like their parts drawn one by one
+        layer.blit(image.premul_alpha(), pos, special_flags=pygame.BLEND_PREMULTIPLIED)
+
     def draw(self, surface):
+        player = self.game.player
+        layers = [
+            self.layer('status', (player.health, player.max_health, self.game.kills, self.game.money), self.render_status),
+            self.layer('hotbar', self.selected_slot, self.render_hotbar),
+        ]
+        for layer, pos in layers:
+            surface.blit(layer, pos, special_flags=pygame.BLEND_PREMULTIPLIED)
+
+        self.draw_stats(surface)
+        self.draw_minimap(surface)
+        self.draw_boss_health(surface)
+
+    def render_status(self):
+        player = self.game.player
+        kills_text = fonts.render(f'Kills: {self.game.kills}', self.font_size, self.kills_color)
+        money_text = fonts.render(f'$: {self.game.money}', self.font_size, self.money_color)
+        width = max(10 + player.max_health * (self.heart_width + self.heart_spacing), 10 + kills_text.get_width(), 10 + money_text.get_width())
+        layer = pygame.Surface((width, max(10 + self.heart_height, 80 + money_text.get_height())), pygame.SRCALPHA)
+
         # health bar
-        for i in range(self.game.player.max_health):
+        for i in range(player.max_health):
             x = 10 + i*(self.heart_width + self.heart_spacing)
             y = 10
-            if i < self.game.player.health:
-                surface.blit(self.heart_image, (x,y))
-                #color = self.health_color
+            if i < player.health:
+                self.compose(layer, self.heart_image, (x,y))
             else:
-                surface.blit(self.heart_bg, (x,y))
-                #color = self.empty_health_color
-            surface.blit(self.heart_border, (x,y))
-            # pygame.draw.rect(surface, color, (x,y,self.heart_width, self.heart_height))
+                self.compose(layer, self.heart_bg, (x,y))
+            self.compose(layer, self.heart_border, (x,y))
 
-        # health_text = self.font.render(f'Health: {self.game.player.health}', True, (255,0,0))
+        # health_text = fonts.render(f'Health: {self.game.player.health}', self.font_size, (255,0,0))
         # surface.blit(health_text, (10,10))
 
-        kills_text = self.font.render(f'Kills: {self.game.kills}', True, self.kills_color)
-        surface.blit(kills_text, (10,50))
-
-        money_text = self.font.render(f'$: {self.game.money}', True, self.money_color)
-        surface.blit(money_text, (10,80))
+        self.compose(layer, kills_text, (10,50))
+        self.compose(layer, money_text, (10,80))
+        return layer, (0,0)
 
-        # HOTBAR
+    def render_hotbar(self):
         start_x = WINDOW_HEIGHT // 3 - (len(self.hotbar_slots)*(self.slot_width + self.padding)) // 2
         y = WINDOW_HEIGHT - self.slot_height - 10
 
+        # the layer reaches a padding past the slots so labels poking out are kept
+        origin = (start_x - self.padding, y - self.padding)
+        layer = pygame.Surface((len(self.hotbar_slots)*(self.slot_width + self.padding) + self.padding, self.slot_height + 2*self.padding), pygame.SRCALPHA)
+
+        # slot background, alpha premultiplied by hand since fill does not blend
+        alpha = self.hotbar_bg_color[3]
+        bg_color = [channel * alpha // 255 for channel in self.hotbar_bg_color[:3]] + [alpha]
+
         for i, slot in enumerate(self.hotbar_slots):
-            rect = pygame.Rect(start_x + i*(self.slot_width + self.padding), y, self.slot_width, self.slot_height)
-            temp_surf = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-            temp_surf.fill((self.hotbar_bg_color))
-            surface.blit(temp_surf, rect.topleft)
+            rect = pygame.Rect(start_x + i*(self.slot_width + self.padding) - origin[0], self.padding, self.slot_width, self.slot_height)
+            layer.fill(bg_color, rect)
             
             if i == self.selected_slot:
-                pygame.draw.rect(surface, self.hotbar_border_color, rect, 3)
-            
-            slot_text_font = pygame.font.Font(FONT_PATH, 12)
+                pygame.draw.rect(layer, self.hotbar_border_color, rect, 3)
 
             icon_image = self.slot_images[i]
-            icon_rect = icon_image.get_rect(center=rect.center)
-            surface.blit(icon_image, icon_rect)
+            self.compose(layer, icon_image, icon_image.get_rect(center=rect.center))
 
-            text = slot_text_font.render(slot, True, (255,255,255))
-            text_rect = text.get_frect(center = (rect.centerx, rect.centery - 30))
-            surface.blit(text, text_rect)
+            text = fonts.render(slot, 12, (255,255,255))
+            self.compose(layer, text, text.get_frect(center = (rect.centerx, rect.centery - 30)))
 
-            cost_text = self.font.render(f'${self.slot_costs[i]}', True, self.text_color)
-            cost_rect = cost_text.get_frect(midtop=(rect.centerx, rect.bottom - 25))
-            surface.blit(cost_text, cost_rect)
+            cost_text = fonts.render(f'${self.slot_costs[i]}', self.font_size, self.text_color)
+            self.compose(layer, cost_text, cost_text.get_frect(midtop=(rect.centerx, rect.bottom - 25)))
 
-            key_text = self.font.render(f'{i + 1}', True, self.text_color)
-            key_rect = key_text.get_frect(center = (rect.centerx - 28, rect.centery - 26))
-            surface.blit(key_text, key_rect)
-        
-        self.draw_stats(surface)
-        self.draw_minimap(surface)
-        self.draw_boss_health(surface)
+            key_text = fonts.render(f'{i + 1}', self.font_size, self.text_color)
+            self.compose(layer, key_text, key_text.get_frect(center = (rect.centerx - 28, rect.centery - 26)))
+
+        return layer, origin
 
     def select_slot(self, index):
         if 0 <= index < len(self.hotbar_slots):
@@ -130,8 +155,6 @@ class HUD:
 
     # stat tracker
     def draw_stats(self, surface):
-        font = pygame.font.Font(FONT_PATH, 18)
-
         stat_values = {
             'Damage': self.game.player.damage,
             'Speed': self.game.player.speed,
@@ -139,32 +162,46 @@ class HUD:
             'Range': self.game.bullet_lifetime,
             }
 
+        layer, pos = self.layer('stats', tuple(stat_values.values()), lambda: self.render_stats(stat_values))
+        surface.blit(layer, pos, special_flags=pygame.BLEND_PREMULTIPLIED)
+
+    def render_stats(self, stat_values):
         icons = {}
         for upgrade in UPGRADES:
             name = upgrade['name']
             if name in stat_values:
-                img = pygame.image.load(upgrade['image']).convert_alpha()
-                img = pygame.transform.smoothscale(img, (24,24))
-                icons[name] = img
+                icons[name] = assets.scaled(upgrade['image'], (24,24), 'smoothscale')
 
         x = WINDOW_WIDTH / 4 - 380
         y = 600
         padding = 5
         line_spacing = 10
 
+        texts = {name: fonts.render(str(value), self.font_size, (255,255,255)) for name, value in stat_values.items()}
+        origin = (int(x), y)
+        width = max(icons[name].get_width() + padding + text.get_width() for name, text in texts.items()) + 1
+        height = sum(icon.get_height() + line_spacing for icon in icons.values())
+        layer = pygame.Surface((width, height), pygame.SRCALPHA)
+
         for stat_name in ['Damage', 'FireRate', 'Speed', 'Range']:
             icon = icons[stat_name]
-            value = str(stat_values[stat_name])
-
-            surface.blit(icon, (x,y))
+            text = texts[stat_name]
 
-            text = font.render(value, True, (255,255,255))
-            surface.blit(text, (x+ icon.get_width() + padding, y + (icon.get_height() - text.get_height()) // 2))
+            self.compose(layer, icon, (int(x) - origin[0], y - origin[1]))
+            self.compose(layer, text, (int(x + icon.get_width() + padding) - origin[0], y + (icon.get_height() - text.get_height()) // 2 - origin[1]))
             
             y += icon.get_height() + line_spacing
 
+        return layer, origin
 
     def draw_minimap(self, surface):
+        # the map only changes when a room is visited or cleared or the player moves to another room
+        rooms = self.game.rooms
+        state = (id(rooms), self.game.get_player_room(), tuple((room.visited, room.cleared) for room in rooms.values()))
+        map_surface, pos = self.layer('minimap', state, self.render_minimap)
+        surface.blit(map_surface, pos)
+
+    def render_minimap(self):
             '''Calculates map size from room positions. Rooms are Blue squares and the room that the player is in has a red dot'''
 
             # calculate map bounds
@@ -211,7 +248,7 @@ class HUD:
                 pygame.draw.rect(map_surface, self.player_color, (px + self.room_size / 4, py + self.room_size / 4, self.room_size / 2, self.room_size / 2), border_radius=25)
 
             # blit on map surface with offset position
-            surface.blit(map_surface, (WINDOW_WIDTH - map_width - 40, 20))
+            return map_surface, (WINDOW_WIDTH - map_width - 40, 20)
 
     def draw_boss_health(self, surface):
         boss = getattr(self.game, 'boss', None)
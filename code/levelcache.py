@@ -0,0 +1,119 @@
+from settings import *
+from hashlib import blake2b
+import mmap
+import os
+import re
+import struct
+
+LEVEL_CACHE_VERSION = 1
+MAGIC = b'SWLV'
+
+# magic, version, source fingerprint, width, height, door bits, opaque, collision count, entity count
+HEADER = struct.Struct('<4sH8sHHBBII')
+COLLISION = struct.Struct('<4d')
+ENTITY = struct.Struct('<2dB') # x, y, name length, followed by the utf8 name
+DOOR_BITS = ['top', 'bottom', 'left', 'right']
+
+SOURCE_PATTERN = re.compile(rb'source="([^"]+)"')
+
+def cache_path(path):
+    return path + LEVEL_CACHE_SUFFIX
+
+def dependencies(path, found = None):
+    # the tmx, its tilesets and their images, any of them changing invalidates the cache
+    found = found if found is not None else []
+    found.append(path)
+    if path.endswith(('.tmx', '.tsx')):
+        try:
+            with open(path, 'rb') as file:
+                sources = SOURCE_PATTERN.findall(file.read())
+        except OSError:
+            return found
+        for source in sources:
+            source_path = os.path.normpath(join(os.path.dirname(path), source.decode()))
+            if source_path not in found:
+                dependencies(source_path, found)
+    return found
+
+def fingerprint(path):
+    digest = blake2b(digest_size=8)
+    digest.update(struct.pack('<HH', LEVEL_CACHE_VERSION, TILE_SIZE))
+    for dependency in dependencies(path):
+        try:
+            stat = os.stat(dependency)
+            digest.update(struct.pack('<qq', stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            digest.update(b'missing')
+        digest.update(dependency.encode())
+    return digest.digest()
+
+def save_level(path, template):
+    if not LEVEL_CACHE:
+        return
+
+    surface = template.surface
+    opaque = not surface.get_flags() & pygame.SRCALPHA
+    door_bits = sum(1 << i for i, direction in enumerate(DOOR_BITS) if template.doors[direction])
+
+    chunks = [HEADER.pack(MAGIC, LEVEL_CACHE_VERSION, fingerprint(path), template.width, template.height,
+                          door_bits, opaque, len(template.collisions), len(template.entities))]
+    for collision in template.collisions:
+        chunks.append(COLLISION.pack(*collision))
+    for name, x, y in template.entities:
+        name = (name or '').encode()
+        chunks.append(ENTITY.pack(x, y, len(name)) + name)
+    chunks.append(pygame.image.tobytes(surface, 'RGB' if opaque else 'RGBA'))
+
+    # write to a temp file first so a crash never leaves a half written cache behind
+    temp_path = cache_path(path) + '.tmp'
+    try:
+        with open(temp_path, 'wb') as file:
+            file.write(b''.join(chunks))
+        os.replace(temp_path, cache_path(path))
+    except OSError:
+        pass
+
+def load_level(path):
+    # (width, height, collisions, entities, doors, surface) or None when there is no valid cache
+    if not LEVEL_CACHE:
+        return None
+
+    try:
+        with open(cache_path(path), 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return read_level(path, data)
+    except (OSError, ValueError, struct.error):
+        return None
+
+def read_level(path, data):
+    magic, version, source_print, width, height, door_bits, opaque, collision_count, entity_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != LEVEL_CACHE_VERSION or source_print != fingerprint(path):
+        return None
+    offset = HEADER.size
+
+    collisions = []
+    for _ in range(collision_count):
+        collisions.append(COLLISION.unpack_from(data, offset))
+        offset += COLLISION.size
+
+    entities = []
+    for _ in range(entity_count):
+        x, y, name_length = ENTITY.unpack_from(data, offset)
+        offset += ENTITY.size
+        name = data[offset:offset + name_length].decode() or None
+        offset += name_length
+        entities.append((name, x, y))
+
+    doors = {direction: bool(door_bits & 1 << i) for i, direction in enumerate(DOOR_BITS)}
+
+    # the pixels are read straight out of the mapped file and copied once into a display format surface
+    size = (width * TILE_SIZE, height * TILE_SIZE)
+    pixel_format = 'RGB' if opaque else 'RGBA'
+    pixel_count = size[0] * size[1] * len(pixel_format)
+    with memoryview(data)[offset:offset + pixel_count] as pixels:
+        if len(pixels) != pixel_count:
+            return None
+        mapped = pygame.image.frombuffer(pixels, size, pixel_format)
+        surface = mapped.convert() if opaque else mapped.convert_alpha()
+        del mapped
+
+    return width, height, collisions, entities, doors, surface
@@ -3,16 +3,36 @@ from player import Player
 from sprites import *
 from turret import Turret
 from enemy import *
-from bullet import Bullet
+from bullet import Bullet, RockProjectile, ProjectilePool, rotation_frames
 from room import *
 
-from groups import AllSprites
+from groups import AllSprites, CollisionSprites
+from camera import RenderTarget
+from assets import assets
+from fonts import fonts
+from controls import Controls, ScriptedControls
+from profiler import profiler
+from clock import GameClock
+import os
+from scheduler import Scheduler
+from sight import OccupancyGrid, LineOfSight
+from flowfield import FlowField
+from spatial import NeighbourIndex
+from swarm import make_enemy_store
 from random import randint, choice, choices
 from hud import HUD
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless = False, controls = None, game_clock = None):
         # setup
+        # headless runs only simulate, the window goes to sdl's dummy driver and input comes from a script
+        self.headless = headless
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        self.controls = controls or (ScriptedControls() if headless else Controls())
+        # every gameplay timer reads this clock, it only advances in step so pause screens freeze them
+        self.game_clock = game_clock or GameClock()
+
         pygame.init()
         self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption('Swarm TD')
@@ -20,10 +40,8 @@ class Game:
         self.running = True
 
         # camera zoom
-        self.camera_zoom = CAMERA_ZOOM
-        self.camera_width = int(CAMERA_WIDTH / self.camera_zoom)
-        self.camera_height = int(CAMERA_HEIGHT / self.camera_zoom)
-        self.camera_surface = pygame.Surface((self.camera_width, self.camera_height))
+        self.render_target = RenderTarget(self.display_surface)
+        self.set_camera_zoom(CAMERA_ZOOM)
 
         # smooth camera zoom 
         self.target_zoom = CAMERA_ZOOM
@@ -35,7 +53,14 @@ class Game:
 
         # groups
         self.all_sprites = AllSprites()
-        self.collision_sprites = pygame.sprite.Group()
+        self.scheduler = Scheduler(self.get_room_at)
+
+        # frame counter for lookups cached once per frame
+        self.frame = 0
+        self.player_room = None
+        self.player_room_frame = None
+        self.all_sprites.scheduler = self.scheduler
+        self.collision_sprites = CollisionSprites()
         self.bullet_sprites = pygame.sprite.Group()
         self.enemy_sprites = pygame.sprite.Group()
         self.turret_sprites = pygame.sprite.Group()
@@ -43,12 +68,26 @@ class Game:
         self.player_sprites = pygame.sprite.Group()
         self.trap_sprites = pygame.sprite.Group()
 
+        # line of sight
+        self.occupancy = OccupancyGrid(self.collision_sprites)
+        self.sight = LineOfSight(self.occupancy)
+        self.flow_field = FlowField(self.occupancy)
+
+        # enemy neighbours for flying enemy separation
+        self.enemy_index = NeighbourIndex(FLYING_SEPARATION_RADIUS)
+        # vectorised enemy kinematics, None when numpy is missing
+        self.enemy_store = make_enemy_store()
+
         # attack timer
         self.can_shoot = True
         self.shoot_time = 0
         self.attack_cooldown = PLAYER_FIRE_RATE # 200ms # fire rate
         self.bullet_lifetime = BULLET_LIFETIME
 
+        # reused projectile sprites
+        self.bullet_pool = ProjectilePool(Bullet)
+        self.rock_pool = ProjectilePool(RockProjectile)
+
         # enemy timer
         self.enemy_event = pygame.event.custom_type()
         pygame.time.set_timer(self.enemy_event, 300)
@@ -75,15 +114,14 @@ class Game:
         self.current_room = self.get_player_room()
         self.hud = HUD(self)
 
+        # bake whatever was loaded for the next launch
+        assets.save_atlas()
+
     def load_images(self):
         # fireball bullet
-        self.bullet_surf = pygame.image.load(join('images', 'bullets', 'fireball.png')).convert_alpha()
-        self.bullet_surf = pygame.transform.scale2x(self.bullet_surf)
-        self.bullet_surf = pygame.transform.smoothscale(self.bullet_surf, (16,16))
+        self.bullet_surf = assets.scaled(join('images', 'bullets', 'fireball.png'), (16,16), 'scale2x_smoothscale')
         # bone bullet
-        self.bone_bullet = pygame.image.load(join('images', 'bullets', 'bone.png')).convert_alpha()
-        self.bone_bullet = pygame.transform.scale2x(self.bone_bullet)
-        self.bone_bullet = pygame.transform.smoothscale(self.bone_bullet, (16,16))
+        self.bone_bullet = assets.scaled(join('images', 'bullets', 'bone.png'), (16,16), 'scale2x_smoothscale')
         # create a round bullet surface
         bullet_radius = 6
         self.round_bullet_surf = pygame.Surface((bullet_radius*2, bullet_radius*2), pygame.SRCALPHA)
@@ -95,35 +133,35 @@ class Game:
         inner_radius = 4  # smaller radius
         pygame.draw.circle(self.round_bullet_surf, (255, 165, 0), (bullet_radius, bullet_radius), inner_radius)
 
+        # spinning bullet frames
+        for surf in (self.bullet_surf, self.bone_bullet, self.round_bullet_surf):
+            rotation_frames(surf)
+
+        # boss rock
+        self.rock_surf = assets.scaled(join('images', 'boss', 'rock.png'), (64,64))
+
         # turret
-        self.turret_base = pygame.image.load(join('images', 'turret', 'base.png')).convert_alpha()
-        self.turret_base = pygame.transform.scale2x(self.turret_base)
-        self.turret_base = pygame.transform.smoothscale(self.turret_base, (24,24))
-        self.turret_gun = pygame.image.load(join('images', 'turret', 'gun.png')).convert_alpha()
-        self.turret_gun = pygame.transform.scale(self.turret_gun, (24,9))
+        self.turret_base = assets.scaled(join('images', 'turret', 'base.png'), (24,24), 'scale2x_smoothscale')
+        self.turret_gun = assets.scaled(join('images', 'turret', 'gun.png'), (24,9))
         
         # bomb
-        self.bomb_surf = pygame.image.load(join('images', 'bullets','bomb.png')).convert_alpha()
-        self.bomb_surf = pygame.transform.scale(self.bomb_surf, (16,16))
+        self.bomb_surf = assets.scaled(join('images', 'bullets','bomb.png'), (16,16))
         # traps
         # spikes static surf
-        self.trap_surf = pygame.image.load(join('images', 'traps', '1.png')).convert_alpha()
-        self.trap_surf = pygame.transform.scale(self.trap_surf, (720 // TILE_SIZE, 1280 // TILE_SIZE))
+        self.trap_surf = assets.scaled(join('images', 'traps', '1.png'), (720 // TILE_SIZE, 1280 // TILE_SIZE))
         
         # barbed wire
-        self.barbed_wire_surf = pygame.image.load(join('images', 'barbedwire', 'wire.png')).convert_alpha()
-        self.barbed_wire_surf= pygame.transform.scale(self.barbed_wire_surf, (100, 67))
+        self.barbed_wire_surf = assets.scaled(join('images', 'barbedwire', 'wire.png'), (100, 67))
 
         # boss smash cone radius
-        self.smash_cone_surf = pygame.image.load(join('images', 'boss','boss_cone_effect.png')).convert_alpha()
+        self.smash_cone_surf = assets.load(join('images', 'boss','boss_cone_effect.png'))
 
         # trap animation frames
         self.trap_frames = []
         trap_folder = join('images', 'traps')
         for i in range(1, 10):
             full_path = join(trap_folder, f'{i if i <= 5 else 1}.png')
-            surf = pygame.image.load(full_path).convert_alpha()
-            self.trap_frames.append(surf)
+            self.trap_frames.append(assets.load(full_path))
         
         self.trap_surf = self.trap_frames[0]
 
@@ -138,14 +176,14 @@ class Game:
                 for _, _, file_names in walk(direction_path):
                     for file_name in file_names:
                         full_path = join(direction_path, file_name)
-                        surf = pygame.image.load(full_path).convert_alpha()
+                        width, height = assets.size_of(full_path)
                         if folder.lower() == 'goblin':
-                            surf_big = pygame.transform.scale2x(surf)
-                            surf = pygame.transform.smoothscale(surf_big, (int(surf_big.width * 0.075), int(surf_big.height * 0.075)))
+                            surf = assets.scaled(full_path, (int(width * 2 * 0.075), int(height * 2 * 0.075)), 'scale2x_smoothscale')
 
                         elif folder.lower() == 'skeleton':
-                            surf_big = pygame.transform.scale2x(surf)
-                            surf = pygame.transform.scale(surf_big, (int(surf_big.width * 0.35), int(surf_big.height * 0.35)))
+                            surf = assets.scaled(full_path, (int(width * 2 * 0.35), int(height * 2 * 0.35)), 'scale2x_scale')
+                        else:
+                            surf = assets.load(full_path)
                         self.enemy_frames[folder][direction].append(surf)
                         
             # handle boss separately
@@ -159,20 +197,26 @@ class Game:
 
                         for _, _, files in walk(path):
                             for file_name in files:
-                                surf = pygame.image.load(join(path, file_name)).convert_alpha()
-                                frames.append(surf)
+                                frames.append(assets.load(join(path, file_name)))
 
                         self.enemy_frames['boss'][state][direction] = frames
                 continue
 
+        # bake the hit flash, death and mask variants once per enemy type
+        for folder, frames in self.enemy_frames.items():
+            if folder == 'boss':
+                frames['idle'] = EnemyFrames(frames['idle'])
+            else:
+                self.enemy_frames[folder] = EnemyFrames(frames)
+
     def input(self):
         # shooting
-        if pygame.mouse.get_pressed()[0] and self.can_shoot:
+        if self.controls.mouse_buttons()[0] and self.can_shoot:
             if self.build_mode:
                 return
             pos = self.player.rect.center + self.player.direction * 10
             
-            mouse_x, mouse_y = pygame.mouse.get_pos()
+            mouse_x, mouse_y = self.controls.mouse_pos()
             direction_x = mouse_x - WINDOW_WIDTH / 2
             direction_y = mouse_y - WINDOW_HEIGHT / 2
             direction = pygame.Vector2(direction_x, direction_y).normalize()
@@ -181,13 +225,13 @@ class Game:
             pos = pygame.Vector2(self.player.rect.center)
             direction = (mouse_world_pos - pos).normalize()
 
-            Bullet(self.bullet_surf, pos, direction, self.bullet_lifetime, self.player, (self.all_sprites, self.bullet_sprites), self.collision_sprites, self.enemy_sprites, game=self)
+            self.bullet_pool.acquire(self.bullet_surf, pos, direction, self.bullet_lifetime, self.player, (self.all_sprites, self.bullet_sprites), self.collision_sprites, self.enemy_sprites, game=self)
 
             self.can_shoot = False
-            self.shoot_time = pygame.time.get_ticks()
+            self.shoot_time = self.game_clock.get_ticks()
 
     def get_mouse_pos(self):
-        mx, my = pygame.mouse.get_pos()
+        mx, my = self.controls.mouse_pos()
 
         mx /= WINDOW_WIDTH / self.camera_width
         my /= WINDOW_HEIGHT / self.camera_height
@@ -202,7 +246,7 @@ class Game:
         y = round(pos.y / TILE_SIZE) * TILE_SIZE
         test_rect = pygame.Rect(x,y,size,size)
 
-        for sprite in self.collision_sprites:
+        for sprite in self.collision_sprites.query(test_rect):
             if test_rect.colliderect(sprite.rect):
                 return False
             
@@ -224,7 +268,7 @@ class Game:
         pos.y = round(pos.y / TILE_SIZE) * TILE_SIZE
 
         Turret(pos, self.turret_base, self.turret_gun, (self.all_sprites, self.turret_sprites), self.round_bullet_surf,
-               (self.all_sprites, self.bullet_sprites), self.all_sprites, self.collision_sprites, self.enemy_sprites, game)
+               (self.all_sprites, self.bullet_sprites), self.all_sprites, self.collision_sprites, self.enemy_sprites, self)
         self.money -= TURRET_COST
 
     def place_trap(self, pos, angle = 0):
@@ -254,26 +298,57 @@ class Game:
 
     def attack_timer(self):
         if not self.can_shoot:
-            current_time = pygame.time.get_ticks()
+            current_time = self.game_clock.get_ticks()
             if current_time - self.shoot_time >= self.attack_cooldown:
                 self.can_shoot = True
 
-    def render_room_to_surface(self, room, tile_size=TILE_SIZE):
-        # convert a room tiles into a single surface to imporve performance
-        width = room.width * tile_size
-        height = room.height * tile_size
-        surf = pygame.Surface((width, height), pygame.SRCALPHA)
-
-        # Draw layers: floor, walls, objects
-        for layer_name in ['floor', 'walls', 'objects']:
-            try:
-                layer = room.tmx.get_layer_by_name(layer_name)
-            except ValueError:
-                continue
-            for x, y, image in layer.tiles():
-                surf.blit(image, (x * tile_size, y * tile_size))
+    def render_room_to_surface(self, room):
+        # room tiles are pre-rendered into a single surface per template to imporve performance
+        room.rendered_surface = room.template.surface
+
+    def realise_room(self, grid):
+        # build the colliders, spawn points and occupancy grid of one placed room
+        room = self.rooms[grid]
+        px, py = self.room_positions[grid]
+
+        # Collisions
+        room.colliders = add_room_colliders(grid, self.rooms, self.room_positions, (self.all_sprites, self.collision_sprites), tile_size=TILE_SIZE)
+        for x, y, width, height in room.template.collisions:
+            room.colliders.append(Sprite((px + x, py + y), pygame.Surface((width, height)), self.collision_sprites))
+
+        # Entities
+        room.spawn_points = [(px + x, py + y) for name, x, y in room.template.entities if name == 'Enemy']
+
+        self.occupancy.add_room(grid, room, (px, py))
+        self.scheduler.frozen.discard(grid)
+        self.realised_rooms.add(grid)
+        self.flow_field.invalidate()
+
+    def release_room(self, grid):
+        # drop the colliders and occupancy grid of a far away room, the sprites in it stop updating
+        room = self.rooms[grid]
+        for collider in room.colliders:
+            collider.kill()
+        room.colliders = []
+
+        self.occupancy.remove_room(grid)
+        self.scheduler.frozen.add(grid)
+        self.realised_rooms.discard(grid)
+        self.flow_field.invalidate()
+
+    def update_realised_rooms(self, grid):
+        # realise every room next to the player's room and release the ones that are far away
+        if grid is None or grid == self.realised_around:
+            return
+        self.realised_around = grid
 
-        room.rendered_surface = surf
+        for key in list(self.realised_rooms):
+            if abs(key[0] - grid[0]) + abs(key[1] - grid[1]) > ROOM_RELEASE_DISTANCE:
+                self.release_room(key)
+
+        for key in self.rooms:
+            if key not in self.realised_rooms and abs(key[0] - grid[0]) + abs(key[1] - grid[1]) <= ROOM_REALISE_DISTANCE:
+                self.realise_room(key)
 
     def setup(self):
         start_room, rooms = import_rooms()
@@ -286,28 +361,27 @@ class Game:
         self.player = None  # reset
         self.room_positions = positions
         self.rooms = placed
+        self.room_index = RoomIndex(placed, positions)
 
-        for (gx, gy), room in placed.items():
-            px, py = positions[(gx, gy)]
-
+        # rooms are realised around the player as they move, the start room is realised first
+        for room in placed.values():
             self.render_room_to_surface(room)
-            
-            # Collisions
-            for obj in room.tmx.get_layer_by_name('collisions'):
-                Sprite((px + obj.x, py + obj.y), pygame.Surface((obj.width, obj.height)), self.collision_sprites)
-
-            # Entities
-            for obj in room.tmx.get_layer_by_name('entities'):
-                if obj.name == 'Player':
-                    self.player = Player((px + obj.x, py + obj.y),
-                                        self.all_sprites,
-                                        self.player_sprites,
-                                        self.collision_sprites)
-                    self.player_start_pos = (px + obj.x, py + obj.y)
-                elif obj.name == 'Enemy':
-                    room.spawn_points.append((px + obj.x, py + obj.y))
-
-        self.rooms, self.room_positions = add_room_colliders_with_doors(self.rooms, self.room_positions, self.all_sprites, self.collision_sprites, tile_size=TILE_SIZE, door_size=60)
+
+        self.realised_rooms = set()
+        self.realised_around = None
+        self.occupancy.build({}, {})
+        self.update_realised_rooms((0, 0))
+
+        # Player
+        px, py = positions[(0,0)]
+        for name, x, y in start_room.template.entities:
+            if name == 'Player':
+                self.player = Player((px + x, py + y),
+                                    self.all_sprites,
+                                    self.player_sprites,
+                                    self.collision_sprites,
+                                    self)
+                self.player_start_pos = (px + x, py + y)
         
         if self.player is None:
             # fallback: spawn at center of start room
@@ -316,7 +390,8 @@ class Game:
                                 py + start_room.height*TILE_SIZE//2),
                                 self.all_sprites,
                                 self.player_sprites,
-                                self.collision_sprites)
+                                self.collision_sprites,
+                                self)
             self.player_start_pos = self.player.rect.center
 
     def player_collision(self):
@@ -336,18 +411,15 @@ class Game:
             pygame.display.flip()
 
     def get_player_room(self):
-        px, py = self.player.rect.center
-
-        for (gx, gy), (room_x, room_y) in self.room_positions.items():
-            room = self.rooms[(gx, gy)]
-
-            room_w = room.width * TILE_SIZE
-            room_h = room.height * TILE_SIZE
-
-            if room_x <= px < room_x + room_w and room_y <= py < room_y + room_h:
-                return (gx, gy)
+        # looked up at most once per frame, every caller in the frame shares the result
+        if self.player_room_frame != self.frame:
+            self.player_room = self.get_room_at(self.player.rect.center)
+            self.player_room_frame = self.frame
+        return self.player_room
 
-        return None
+    def get_room_at(self, pos):
+        # enemies and structures can find their own room too, the scheduler also tracks it per sprite
+        return self.room_index.room_at(pos)
 
     def spawn_enemies_for_room(self, room):
         if room.enemies_spawned or not room.spawn_points:
@@ -378,15 +450,12 @@ class Game:
             return
 
         room.enemies = [e for e in room.enemies if e.alive()]
-        print(room.loot_spawned)
 
         if not room.enemies:
             if not getattr(room, 'loot_spawned', False):
-                if random.random() < LOOT_DROP_CHANCE:
-                    print('loot drop')            
-                    
-                    if room.spawn_points:
-                        spawn_pos = choice(room.spawn_points)
+                # rooms without spawn points (the boss room) have nowhere to drop loot
+                if random.random() < LOOT_DROP_CHANCE and room.spawn_points:
+                    spawn_pos = choice(room.spawn_points)
                     
                     min_distance = 50
                     if pygame.Vector2(spawn_pos).distance_to(self.player.rect.center) <= min_distance or spawn_pos in room.spawn_points:
@@ -415,12 +484,14 @@ class Game:
     def enter_boss_room(self):
         self.load_boss_room()
         self.target_zoom = 0.6
-        self.camera_zoom += (self.target_zoom - self.camera_zoom) * self.zoom_speed
-        self.camera_width = int(CAMERA_WIDTH / self.camera_zoom)
-        self.camera_height = int(CAMERA_HEIGHT / self.camera_zoom)
-        self.camera_surface = pygame.Surface((self.camera_width, self.camera_height))
+        self.set_camera_zoom(self.camera_zoom + (self.target_zoom - self.camera_zoom) * self.zoom_speed)
         self.rooms = {(0,0): self.boss_room}
         self.room_positions = {(0,0): (0,0)}
+        self.room_index = RoomIndex(self.rooms, self.room_positions)
+        self.player_room_frame = None
+        self.realised_rooms = {(0,0)}
+        self.realised_around = (0,0)
+        self.scheduler.frozen.clear()
         self.current_room = (0,0)
         self.state = 'boss'
 
@@ -434,30 +505,35 @@ class Game:
         self.trap_sprites.empty()
         self.player_sprites.empty()
         self.upgrade_sprites.empty()
+        if self.enemy_store:
+            self.enemy_store.clear()
         self.camera_zoom = 0.6
         for sprite in self.all_sprites:
             sprite.kill()
         
         path = join('maps','tsx','tboi','boss_room', 'boss_room.tmx')
-        room = Room(path)
+        room = Room(load_template(path))
         self.boss_room = room
 
         px, py = 0, 0
         self.render_room_to_surface(room)
 
-        for obj in room.tmx.get_layer_by_name('collisions'):
-            Sprite((px + obj.x, py + obj.y), pygame.Surface((obj.width, obj.height)), self.collision_sprites)
+        for x, y, width, height in room.template.collisions:
+            Sprite((px + x, py + y), pygame.Surface((width, height)), self.collision_sprites)
+        self.collision_sprites.rebuild()
+        self.occupancy.build({(0,0): room}, {(0,0): (px, py)})
+        self.flow_field.invalidate()
         
         boss_pos = None
         player_pos = None
 
-        for obj in room.tmx.get_layer_by_name('entities'):
-            if obj.name == 'Player':
-                player_pos = (px + obj.x, py + obj.y)
-            if obj.name == 'Boss':
-                boss_pos = (px + obj.x, py + obj.y)
+        for name, x, y in room.template.entities:
+            if name == 'Player':
+                player_pos = (px + x, py + y)
+            if name == 'Boss':
+                boss_pos = (px + x, py + y)
 
-        self.player = Player(player_pos, self.all_sprites, self.player_sprites, self.collision_sprites)
+        self.player = Player(player_pos, self.all_sprites, self.player_sprites, self.collision_sprites, self)
 
         frames = self.enemy_frames['boss']
         idle_frames = frames['idle']
@@ -468,48 +544,31 @@ class Game:
 
     def boss_defeated(self):
         self.state = 'victory'
-        self.run(self.victory_screen_loop)
+        # headless runs have no screens, the driver checks the state instead
+        if not self.headless:
+            self.run(self.victory_screen_loop)
 
     def victory_screen_loop(self, dt):
-        for event in pygame.event.get():
+        for event in self.controls.events():
             if event.type == pygame.QUIT:
                 self.running = False
             if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                self.__init__()
+                self.__init__(self.headless, self.controls, self.game_clock)
                 self.running = False
                 self.run(self.start_screen_loop)
                 return
         
         self.display_surface.fill((0,0,0))
-        title_font = pygame.font.Font(FONT_PATH, 70)
-        small_font = pygame.font.Font(FONT_PATH, 36)
 
-        title = title_font.render('Victory!', True, (0,180,0))
-        prompt = small_font.render('Press R to play again', True, (255,255,255))
+        title = fonts.render('Victory!', 70, (0,180,0))
+        prompt = fonts.render('Press R to play again', 36, (255,255,255))
 
         self.display_surface.blit(title, title.get_frect(center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2 - 40)))
         self.display_surface.blit(prompt, prompt.get_frect(center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2 + 20)))
 
     def gameplay_loop(self, dt):
-        current_room_key = self.get_player_room()
-        if current_room_key:
-            current_room = self.rooms[current_room_key]
-            current_room.visited = True
-            self.current_room = current_room_key
-            rx, ry = self.room_positions[current_room_key]
-            self.camera_target.update(rx, ry)
-
-            # Spawn enemies when entering a room
-            self.check_upgrade_pickup()
-            self.spawn_enemies_for_room(current_room)
-            if not self.portal_spawned:
-                self.check_room_cleared(current_room)
-        
-        if self.all_rooms_cleared() and not self.portal_spawned:
-            self.spawn_portal()
-            self.portal_spawned = True
-
-        for event in pygame.event.get():
+        events = []
+        for event in self.controls.events():
             if event.type == pygame.QUIT:
                 self.running = False
                 return
@@ -519,12 +578,72 @@ class Game:
                 self.running = False
                 self.run(self.pause_screen_loop)
                 return
+
+            # profiler overlay and trace dump
+            if event.type == pygame.KEYDOWN and event.key == PROFILER_OVERLAY_KEY:
+                profiler.toggle_overlay()
+                continue
+            if event.type == pygame.KEYDOWN and event.key == PROFILER_TRACE_KEY:
+                if profiler.tracing:
+                    print('Profiler trace written to', profiler.stop_trace())
+                else:
+                    profiler.start_trace()
+                    print('Profiler recording, press the trace key again to write the trace')
+                continue
             
-            self.handle_event(event)
-        
-        self.attack_timer()
-        self.input()
-        self.player_collision()
+            events.append(event)
+
+        self.step(dt, events)
+
+        if self.player.health <= 0:
+            self.running = False
+            self.run(self.end_screen_loop)
+            return
+        with profiler.section('draw_world'):
+            self.draw_world(dt)
+        with profiler.section('hud'):
+            self.hud.draw(self.display_surface)
+        if profiler.overlay:
+            profiler.draw(self.display_surface)
+
+    def step(self, dt, events = ()):
+        # one simulation tick without any drawing, shared by the window loop and headless runs
+        profiler.new_frame(self.sprite_counts)
+        self.frame += 1
+        self.game_clock.advance(dt)
+        self.sight.new_frame()
+        with profiler.section('rooms'):
+            current_room_key = self.get_player_room()
+            if current_room_key:
+                current_room = self.rooms[current_room_key]
+                current_room.visited = True
+                self.current_room = current_room_key
+                self.update_realised_rooms(current_room_key)
+                rx, ry = self.room_positions[current_room_key]
+                self.camera_target.update(rx, ry)
+
+                # Spawn enemies when entering a room
+                self.check_upgrade_pickup()
+                self.spawn_enemies_for_room(current_room)
+                if not self.portal_spawned:
+                    self.check_room_cleared(current_room)
+            
+            if self.all_rooms_cleared() and not self.portal_spawned:
+                self.spawn_portal()
+                self.portal_spawned = True
+
+        with profiler.section('input'):
+            for event in events:
+                self.handle_event(event)
+            
+            self.attack_timer()
+            self.input()
+        with profiler.section('collision'):
+            self.player_collision()
+        with profiler.section('flow field'):
+            self.flow_field.update(self.player.rect.center)
+        with profiler.section('kinematics'):
+            self.update_enemy_kinematics(dt)
         self.camera_pos.x += (self.camera_target.x - self.camera_pos.x) * self.camera_speed
         self.camera_pos.y += (self.camera_target.y - self.camera_pos.y) * self.camera_speed
 
@@ -539,21 +658,30 @@ class Game:
             rx, ry = self.room_positions[current_room]
             self.camera_target.update(rx, ry)
         
-        camera_rect = pygame.Rect(cam_offset_x, cam_offset_y, self.camera_width, self.camera_height)
-
-        for sprite in self.all_sprites:
-            if camera_rect.colliderect(sprite.rect):
-                if isinstance(sprite, Trap) or isinstance(sprite, BarbedWire):
-                    sprite.update(dt, self.enemy_sprites)
-                else:
-                    sprite.update(dt)
-
-        if self.player.health <= 0:
-            self.running = False
-            self.run(self.end_screen_loop)
-            return
-        self.draw_world(dt)
-        self.hud.draw(self.display_surface)
+        with profiler.section('update'):
+            # headless runs never draw, so the render layers take in new sprites here as well
+            self.all_sprites.flush()
+            self.scheduler.update(dt, current_room)
+        # the player moved in the update, draw_world looks its room up again
+        self.player_room_frame = None
+
+    def sprite_counts(self):
+        # sprites per group for the profiler
+        return {
+            'all sprites': len(self.all_sprites),
+            'enemies': len(self.enemy_sprites),
+            'bullets': len(self.bullet_sprites),
+            'turrets': len(self.turret_sprites),
+            'traps': len(self.trap_sprites),
+            'colliders': len(self.collision_sprites),
+        }
+
+    def update_enemy_kinematics(self, dt):
+        # one batched pass for the whole swarm, or the neighbour index for the per-sprite fallback
+        if self.enemy_store:
+            self.enemy_store.update(dt, self.player.rect.center)
+        else:
+            self.enemy_index.rebuild(self.enemy_sprites)
 
     def can_spawn_enemy(self, spawn_pos, min_distance=200):
         # checks if the spawn_pos is valid (the player is not near the position so the enemies do not spawn over the player)
@@ -605,7 +733,10 @@ class Game:
 
         for sprite in destroyables:
             if target.colliderect(sprite.rect):
+                solid = sprite in self.collision_sprites
                 sprite.kill()
+                if solid:
+                    self.structure_changed(sprite.rect)
                 
                 if isinstance(sprite, Turret):
                     self.money += TURRET_COST // 2
@@ -613,6 +744,11 @@ class Game:
                     self.money += TRAP_COST // 2
                 break
 
+    def structure_changed(self, rect):
+        # keep the walkable grid in sync when a wall is built or destroyed
+        self.occupancy.refresh(rect)
+        self.flow_field.invalidate()
+
     def handle_event(self, event):
         # turret placing
         if self.build_mode and event.type == pygame.MOUSEBUTTONDOWN:
@@ -628,7 +764,7 @@ class Game:
                     self.place_trap(mouse_world_pos, self.trap_rotation_angle)
                 elif self.hud.selected_slot == 3:       # bomb
                     valid = True
-                    for sprite in self.collision_sprites:
+                    for sprite in self.collision_sprites.query(pygame.Rect(mouse_world_pos, (1, 1))):
                         if pygame.Rect(sprite.rect).collidepoint(mouse_world_pos):
                             valid = False
                             break
@@ -667,12 +803,15 @@ class Game:
 
         # zoom camera with scroll
         if event.type == pygame.MOUSEWHEEL:
-            self.camera_zoom += event.y * 0.1
-            self.camera_zoom += (self.target_zoom - self.camera_zoom) * self.zoom_speed
-            self.camera_zoom = max(0.1, min(self.camera_zoom, 4))
-            self.camera_width = int(CAMERA_WIDTH / self.camera_zoom)
-            self.camera_height = int(CAMERA_HEIGHT / self.camera_zoom)
-            self.camera_surface = pygame.Surface((self.camera_width, self.camera_height))
+            zoom = self.camera_zoom + event.y * 0.1
+            zoom += (self.target_zoom - zoom) * self.zoom_speed
+            self.set_camera_zoom(max(0.1, min(zoom, 4)))
+
+    def set_camera_zoom(self, zoom):
+        self.camera_zoom = zoom
+        self.camera_width = int(CAMERA_WIDTH / zoom)
+        self.camera_height = int(CAMERA_HEIGHT / zoom)
+        self.camera_surface = self.render_target.camera_surface(self.camera_width, self.camera_height)
 
     def draw_world(self, dt):
         self.camera_surface.fill('#1d1c2b')
@@ -691,62 +830,22 @@ class Game:
         cam_offset_y = self.camera_pos.y
         self.all_sprites.offset = pygame.Vector2(-cam_offset_x, -cam_offset_y)
 
-        # draw rooms
+        # background: only rooms the camera can see
+        camera_rect = pygame.Rect(cam_offset_x, cam_offset_y, self.camera_width, self.camera_height)
         for (gx, gy), room in self.rooms.items():
             room_x, room_y = self.room_positions[(gx, gy)]
-            self.camera_surface.blit(
-                room.rendered_surface,
-                (room_x - cam_offset_x, room_y - cam_offset_y)
-            )
-
-        # separating sprites in group for sorting
-        ground_sprites = [s for s in self.all_sprites if getattr(s, 'ground', False) and s not in self.trap_sprites]
-        object_sprites = [s for s in self.all_sprites if not getattr(s, 'ground', False) and not isinstance(s, FlyingEnemy) and s not in self.trap_sprites]
-        flying_sprites = [s for s in self.all_sprites if isinstance(s, FlyingEnemy)]
-        trap_sprites = list(self.trap_sprites)
-
-        # y sorting
-        ground_sprites.sort(key=lambda s: s.rect.centery)
-        object_sprites.sort(key=lambda s: s.rect.centery)
-
-        # ground and object sprites
-        for sprite in ground_sprites + trap_sprites + object_sprites:
-            draw_pos = pygame.Vector2(sprite.rect.topleft) + self.all_sprites.offset
-
-            if isinstance(sprite, Turret):
-                # turret base
-                base_rect = sprite.rect.copy()
-                base_rect.topleft = (sprite.rect.x - cam_offset_x, sprite.rect.y - cam_offset_y)
-                self.camera_surface.blit(sprite.image, base_rect)
-
-                # turret gun
-                gun_rect = sprite.gun_rect.copy()
-                gun_rect.topleft = (sprite.gun_rect.x - cam_offset_x, sprite.gun_rect.y - cam_offset_y)
-                self.camera_surface.blit(sprite.gun_image, gun_rect)
-
-                # turret healthbar
-                bar_width = base_rect.width
-                bar_height = 5
-                elapsed = pygame.time.get_ticks() - sprite.spawn_time
-                remaining_ratio = max(0, (sprite.lifetime - elapsed) / sprite.lifetime)
-                bar_bg_rect = pygame.Rect(base_rect.x, base_rect.y - 10, bar_width, bar_height)
-                bar_fg_rect = pygame.Rect(base_rect.x, base_rect.y - 10, bar_width * remaining_ratio, bar_height)
-                pygame.draw.rect(self.camera_surface, (80, 80, 80), bar_bg_rect)
-                pygame.draw.rect(self.camera_surface, (0, 255, 50), bar_fg_rect)
-
-            elif isinstance(sprite, Bomb):
-                sprite.draw_countdown(self.camera_surface, self.all_sprites.offset)
-            elif isinstance(sprite, Player):
-                sprite.draw(self.camera_surface, pygame.Rect(draw_pos, sprite.rect.size))
-            else:
-                self.camera_surface.blit(sprite.image, draw_pos)
-
-        # draw flying enemies separately
-        for sprite in flying_sprites:
-            draw_pos = pygame.Vector2(sprite.rect.topleft) + self.all_sprites.offset
-            self.camera_surface.blit(sprite.image, draw_pos)
-
-        # draw
+            room_rect = room.rendered_surface.get_rect(topleft = (room_x, room_y))
+            if camera_rect.colliderect(room_rect):
+                self.camera_surface.blit(
+                    room.rendered_surface,
+                    (room_x - cam_offset_x, room_y - cam_offset_y)
+                )
+
+        # ground, trap, object and flying layers
+        with profiler.section('sprites'):
+            self.all_sprites.draw(self.camera_surface)
+
+        # overlay
         for sprite in self.upgrade_sprites:
             draw_pos = pygame.Vector2(sprite.rect.topleft) + self.all_sprites.offset
             sprite.draw(self.camera_surface, self.all_sprites.offset)
@@ -788,9 +887,9 @@ class Game:
                 ghost_rect = ghost_image.get_frect(center=(grid_x, grid_y))
                 self.camera_surface.blit(ghost_image, ghost_rect)
 
-        # draw camera surface to main display surface
-        zoomed_view = pygame.transform.scale(self.camera_surface, (WINDOW_WIDTH, WINDOW_HEIGHT))
-        self.display_surface.blit(zoomed_view, (0, 0))
+        # scale camera surface onto the main display surface
+        with profiler.section('present'):
+            self.render_target.present(self.camera_surface)
     
     def draw_boss_cone(self, surface):
         boss = self.boss
@@ -814,7 +913,7 @@ class Game:
         surface.blit(cone, rect)
 
     def start_screen_loop(self, dt):
-        for event in pygame.event.get():
+        for event in self.controls.events():
             if event.type == pygame.QUIT:
                 self.running = False
             if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
@@ -823,17 +922,15 @@ class Game:
                 return
         
         self.display_surface.fill((20,20,40))
-        title_font = pygame.font.Font(FONT_PATH, 70)
-        small_font = pygame.font.Font(FONT_PATH, 36)
 
-        title = title_font.render('SWARM TD', True, (255,255,255))
-        prompt = small_font.render('Press SPACE to start', True, (200,200,200))
+        title = fonts.render('SWARM TD', 70, (255,255,255))
+        prompt = fonts.render('Press SPACE to start', 36, (200,200,200))
 
         self.display_surface.blit(title, title.get_frect(center=(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2 - 50)))
         self.display_surface.blit(prompt, prompt.get_frect(center=(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2 + 20)))
 
     def pause_screen_loop(self, dt):
-        for event in pygame.event.get():
+        for event in self.controls.events():
             if event.type == pygame.QUIT:
                 self.running = False
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
@@ -860,10 +957,8 @@ class Game:
         pygame.draw.rect(pause_window, (30,30,40,100), background, border_radius=border_radius) # pause window backgroound
         pygame.draw.rect(pause_window, (200, 200, 220), background, width=border_thickness * 2, border_radius = border_radius) # pause window border
 
-        title_font = pygame.font.Font(FONT_PATH, 60)
-        small_font = pygame.font.Font(FONT_PATH, 20)
-        title = title_font.render('Paused', True, (255,255,255))
-        info = small_font.render('Press ESC to Resume', True, (220,220,220))
+        title = fonts.render('Paused', 60, (255,255,255))
+        info = fonts.render('Press ESC to Resume', 20, (220,220,220))
 
         pause_window.blit(title, title.get_frect(center=(pause_window_width // 2, 80)))
         pause_window.blit(info, info.get_frect(center=(pause_window_width // 2, 150)))
@@ -871,21 +966,19 @@ class Game:
         self.display_surface.blit(pause_window, (pause_window_x, pause_window_y))
 
     def end_screen_loop(self, dt):
-        for event in pygame.event.get():
+        for event in self.controls.events():
             if event.type == pygame.QUIT:
                 self.running = False
             if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                self.__init__()
+                self.__init__(self.headless, self.controls, self.game_clock)
                 self.running = False
                 self.run(self.start_screen_loop)
                 return
         
         self.display_surface.fill((0,0,0))
-        title_font = pygame.font.Font(FONT_PATH, 70)
-        small_font = pygame.font.Font(FONT_PATH, 36)
 
-        title = title_font.render('GAME OVER', True, (255,0,0))
-        prompt = small_font.render('Press R to Restart', True, (255,255,255))
+        title = fonts.render('GAME OVER', 70, (255,0,0))
+        prompt = fonts.render('Press R to Restart', 36, (255,255,255))
         self.boss = None
         self.display_surface.blit(title, title.get_frect(center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2 - 40)))
         self.display_surface.blit(prompt, prompt.get_frect(center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2 + 20)))
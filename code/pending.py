@@ -0,0 +1,24 @@
+class PendingSprites:
+    '''Sprites join groups before their rect and attributes exist, so whatever a group does with
+    a new sprite waits for the next flush'''
+    def __init__(self, place):
+        self.place = place
+        self.sprites = {}
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def add(self, sprite):
+        self.sprites[sprite] = None
+
+    def discard(self, sprite):
+        self.sprites.pop(sprite, None)
+
+    def clear(self):
+        self.sprites.clear()
+
+    def flush(self):
+        # placing a sprite can add others, those wait for the next flush
+        sprites, self.sprites = self.sprites, {}
+        for sprite in sprites:
+            self.place(sprite)
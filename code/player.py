@@ -1,11 +1,13 @@
 from settings import * 
+from assets import assets
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, pos, groups, player_sprites, collision_sprites):
+    def __init__(self, pos, groups, player_sprites, collision_sprites, game):
         super().__init__(groups)
+        self.game = game
         self.load_images()
         self.state, self.frame_index = 'down', 3
-        self.image = pygame.image.load(join('images', 'player', 'down', '1.png')).convert_alpha() # use first frame as a static image
+        self.image = assets.load(join('images', 'player', 'down', '1.png')) # use first frame as a static image
         self.rect = self.image.get_frect(center = pos)
         self.hitbox_rect = self.rect.inflate(-13, -13)
         
@@ -33,23 +35,29 @@ class Player(pygame.sprite.Sprite):
 
     def load_images(self):
         self.frames = {'left' : [], 'right' : [], 'up' : [], 'down' : []}
+        self.hit_frames = {'left' : [], 'right' : [], 'up' : [], 'down' : []}
 
         for state in self.frames.keys():
             for folder_path, sub_folders, file_names in walk(join('images', 'player', state)):
                 if file_names:
                     for file_name in file_names:
                         full_path = join(folder_path, file_name)
-                        surf = pygame.image.load(full_path).convert_alpha()
+                        surf = assets.load(full_path)
                         self.frames[state].append(surf)
 
+                        # red outline drawn over the player while invulnerable
+                        outline_surf = pygame.mask.from_surface(surf).to_surface(setcolor=(255,0,0, 100), unsetcolor=(0,0,0,0))
+                        outline_surf.set_colorkey((0,0,0))
+                        self.hit_frames[state].append(outline_surf)
+
     def get_attack_direction(self):
-        mouse_pos = pygame.Vector2(pygame.mouse.get_pos())
+        mouse_pos = pygame.Vector2(self.game.controls.mouse_pos())
         player_pos = pygame.Vector2(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
 
         self.player_direction = (mouse_pos - player_pos).normalize()
 
     def input(self):
-        keys = pygame.key.get_pressed()
+        keys = self.game.controls.keys()
         self.direction.x = int(keys[pygame.K_d]) - int(keys[pygame.K_a])
         self.direction.y = int(keys[pygame.K_s]) - int(keys[pygame.K_w])
         self.direction = self.direction.normalize() if self.direction else self.direction
@@ -63,7 +71,7 @@ class Player(pygame.sprite.Sprite):
         self.rect.center = self.hitbox_rect.center
 
     def take_hit(self, game, amount):
-        now = pygame.time.get_ticks()
+        now = self.game.game_clock.get_ticks()
 
         if not self.invulnerable:
             self.health -= amount
@@ -74,7 +82,7 @@ class Player(pygame.sprite.Sprite):
             print('took damage')
 
     def collision(self, direction):
-        for sprite in self.collision_sprites:
+        for sprite in self.collision_sprites.query(self.hitbox_rect):
             if sprite.rect.colliderect(self.hitbox_rect):
                 if direction == 'horizontal':
                     if self.direction.x > 0: self.hitbox_rect.right = sprite.rect.left
@@ -95,7 +103,7 @@ class Player(pygame.sprite.Sprite):
         self.image = self.frames[self.state][int(self.frame_index % len(self.frames[self.state]))]
     
     def update(self, dt):
-        now = pygame.time.get_ticks()
+        now = self.game.game_clock.get_ticks()
 
         if self.invulnerable:
             if now - self.last_hit_time >= self.invuln_time:
@@ -111,10 +119,8 @@ class Player(pygame.sprite.Sprite):
         self.animate(dt)
 
     def draw(self, surface, rect):
-        surface.blit(self.frames[self.state][int(self.frame_index % len(self.frames[self.state]))], rect.topleft)
+        index = int(self.frame_index % len(self.frames[self.state]))
+        surface.blit(self.frames[self.state][index], rect.topleft)
 
         if self.invulnerable and not self.visible:
-            mask = pygame.mask.from_surface(self.frames[self.state][int(self.frame_index % len(self.frames[self.state]))])
-            outline_surf = mask.to_surface(setcolor=(255,0,0, 100), unsetcolor=(0,0,0,0))
-            outline_surf.set_colorkey((0,0,0))
-            surface.blit(outline_surf, rect.topleft)
\ No newline at end of file
+            surface.blit(self.hit_frames[self.state][index], rect.topleft)
\ No newline at end of file
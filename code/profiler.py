@@ -0,0 +1,221 @@
+from settings import *
+from fonts import fonts
+from collections import deque
+from contextlib import nullcontext
+from time import perf_counter, strftime
+import json
+import os
+
+# module functions wrapped while profiling to count the surfaces they return, (module, names)
+# transforms handed a destination surface draw into it and are not counted
+COUNTED_FUNCTIONS = [
+    (pygame.transform, ['flip', 'scale', 'scale_by', 'rotate', 'rotozoom', 'scale2x', 'smoothscale', 'smoothscale_by']),
+    (pygame.image, ['load', 'frombuffer', 'frombytes', 'fromstring']),
+]
+PERCENTILES = (0.5, 0.95, 0.99)
+
+class Section:
+    '''Times one named block of a frame'''
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, perf_counter())
+
+NO_SECTION = nullcontext()
+
+class Profiler:
+    '''Rolling per frame timings of named sections and entity classes, plus a chrome trace of the last frames.
+
+    The 'transform/image/text surfaces' count covers only surfaces returned by the module functions in
+    COUNTED_FUNCTIONS and text rendered through the font cache. pygame.Surface() itself, surface methods
+    (copy, convert, convert_alpha, subsurface, premul_alpha), Mask.to_surface and direct Font.render
+    calls are c level and not counted, so it is not a total of the surfaces allocated in a frame.
+    '''
+    def __init__(self, window = PROFILER_WINDOW, trace_frames = PROFILER_TRACE_FRAMES):
+        # recording runs while the overlay is shown or a trace is being recorded
+        self.enabled = False
+        self.overlay = False
+        self.tracing = False
+        self.window = window
+
+        # name -> ms per frame for the last window frames
+        self.sections = {}
+        # time added up over many small calls in a frame, per entity class and line of sight
+        self.totals = {}
+        # sprites per group and transform, image and text surfaces, as of the last frame
+        self.counts = {}
+
+        self.frame_start = None
+        self.frame_sections = {}
+        self.frame_totals = {}
+        self.frame_events = []
+        self.allocations = 0
+        self.text_renders = 0
+        self.trace = deque(maxlen = trace_frames)
+        self.origin = perf_counter()
+
+        self.originals = {}
+        self.overlay_surface = None
+        self.overlay_age = 0
+
+    def update_enabled(self):
+        enabled = self.overlay or self.tracing
+        if enabled and not self.enabled:
+            self.enabled = True
+            self.frame_start = None
+            self.install()
+        elif not enabled and self.enabled:
+            self.enabled = False
+            self.uninstall()
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.update_enabled()
+
+    def start_trace(self):
+        self.trace.clear()
+        self.tracing = True
+        self.update_enabled()
+
+    def stop_trace(self, path = None):
+        # writes the frames recorded since start_trace, the overlay keeps running if it is shown
+        path = self.dump_trace(path)
+        self.tracing = False
+        self.update_enabled()
+        return path
+
+    # transform and image surface counting
+    def install(self):
+        self.originals = {}
+        for module, names in COUNTED_FUNCTIONS:
+            for name in names:
+                function = getattr(module, name, None)
+                if function:
+                    self.originals[(module, name)] = function
+                    setattr(module, name, self.counted(function))
+        self.text_renders = fonts.renders
+
+    def uninstall(self):
+        for (module, name), function in self.originals.items():
+            setattr(module, name, function)
+        self.originals = {}
+
+    def counted(self, function):
+        def counted_function(*args, **kwargs):
+            result = function(*args, **kwargs)
+            if not any(result is arg for arg in args) and result is not kwargs.get('dest_surface'):
+                self.allocations += 1
+            return result
+        return counted_function
+
+    # recording
+    def section(self, name):
+        return Section(self, name) if self.enabled else NO_SECTION
+
+    def record(self, name, start, end):
+        self.frame_sections[name] = self.frame_sections.get(name, 0) + end - start
+        self.frame_events.append((name, start, end))
+
+    def add(self, name, seconds):
+        self.frame_totals[name] = self.frame_totals.get(name, 0) + seconds
+
+    def new_frame(self, counts = None):
+        # closes the running frame and starts the next one, counts() is only called while profiling
+        if not self.enabled:
+            return
+
+        now = perf_counter()
+        if self.frame_start is not None:
+            self.record('frame', self.frame_start, now)
+            for table, frame in ((self.sections, self.frame_sections), (self.totals, self.frame_totals)):
+                for name, seconds in frame.items():
+                    table.setdefault(name, deque(maxlen = self.window)).append(seconds * 1000)
+
+            # text cache misses each rendered one new surface
+            self.allocations += fonts.renders - self.text_renders
+            self.text_renders = fonts.renders
+            self.counts = {**(counts() if counts else {}), 'transform/image/text surfaces': self.allocations}
+            self.trace.append((self.frame_events, self.frame_totals, self.counts, now))
+
+        self.frame_start = now
+        self.frame_sections = {}
+        self.frame_totals = {}
+        self.frame_events = []
+        self.allocations = 0
+
+    # results
+    def percentiles(self, samples):
+        ordered = sorted(samples)
+        return [ordered[min(int(len(ordered) * p), len(ordered) - 1)] for p in PERCENTILES]
+
+    def report(self):
+        # (group, name, p50, p95, p99) rows, the slowest first in each group
+        rows = []
+        for group, table in (('section', self.sections), ('entity', self.totals)):
+            stats = [(name, *self.percentiles(samples)) for name, samples in table.items() if samples]
+            stats.sort(key=lambda row: row[2], reverse=True)
+            rows.extend((group, *row) for row in stats)
+        return rows
+
+    def dump_trace(self, path = None):
+        # chrome://tracing or perfetto json, sections are slices and the per frame totals are counters
+        if path is None:
+            os.makedirs(PROFILER_TRACE_DIR, exist_ok=True)
+            path = join(PROFILER_TRACE_DIR, f'trace-{strftime("%Y%m%d-%H%M%S")}.json')
+
+        events = []
+        for frame_events, totals, counts, end in self.trace:
+            for name, start, stop in frame_events:
+                events.append({'name': name, 'ph': 'X', 'pid': 0, 'tid': 0, 'ts': (start - self.origin) * 1e6, 'dur': (stop - start) * 1e6})
+            ts = (end - self.origin) * 1e6
+            events.append({'name': 'entity update ms', 'ph': 'C', 'pid': 0, 'ts': ts, 'args': {name: seconds * 1000 for name, seconds in totals.items()}})
+            events.append({'name': 'counts', 'ph': 'C', 'pid': 0, 'ts': ts, 'args': counts})
+
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+        return path
+
+    # overlay
+    def draw(self, surface):
+        self.overlay_age += 1
+        if self.overlay_surface is None or self.overlay_age >= PROFILER_OVERLAY_INTERVAL:
+            self.overlay_age = 0
+            self.overlay_surface = self.render_overlay()
+        # right edge under the minimap, clear of the status, stats and hotbar
+        surface.blit(self.overlay_surface, self.overlay_surface.get_rect(topright = (WINDOW_WIDTH - 10, 170)))
+
+    def render_overlay(self):
+        # rendered straight from the font, the numbers change too often for the text cache
+        font = fonts.get(14)
+        rows = [('ms', 'p50', 'p95', 'p99')]
+        group = None
+        for row_group, name, *values in self.report():
+            if row_group != group:
+                group = row_group
+                rows.append((f'[{group}]',))
+            rows.append((name, *(f'{value:.2f}' for value in values)))
+        rows.append(('[counts]',))
+        rows.extend((name, str(value)) for name, value in self.counts.items())
+
+        # the font is not monospaced, so the names sit in one column and the numbers are right aligned in the others
+        rendered = [[font.render(cell, True, (230, 230, 230)) for cell in row] for row in rows]
+        name_width = max(cells[0].get_width() for cells in rendered if len(cells) > 1)
+        column_width = 60
+        line_height = font.get_linesize()
+
+        overlay = pygame.Surface((name_width + 3 * column_width + 30, line_height * len(rows) + 20), pygame.SRCALPHA)
+        overlay.fill((20, 20, 30, 200))
+        for i, cells in enumerate(rendered):
+            y = 10 + i * line_height
+            overlay.blit(cells[0], (10, y))
+            for column, cell in enumerate(cells[1:], 1):
+                overlay.blit(cell, (10 + name_width + column * column_width - cell.get_width(), y))
+        return overlay
+
+profiler = Profiler()
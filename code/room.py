@@ -3,21 +3,83 @@ import pytmx
 import os
 from os.path import join
 import random
+from types import MappingProxyType
+from assets import assets
+from levelcache import load_level, save_level
+
+# tile layers drawn into the room surface, bottom to top
+TILE_LAYERS = ['floor', 'walls', 'objects']
+
+# templates by tmx path, kept across restarts
+templates = {}
+
+def load_template(path):
+    # compiled level cache first, the tmx is only parsed when the cache is missing or stale
+    if path not in templates:
+        level = load_level(path)
+        if level:
+            templates[path] = RoomTemplate(path, *level)
+        else:
+            templates[path] = parse_template(path)
+            save_level(path, templates[path])
+    return templates[path]
+
+def parse_template(path):
+    tmx = pytmx.load_pygame(path)
+    layer_names = [layer.name for layer in tmx.layers]
+
+    # (x, y, width, height) of every collider and (name, x, y) of every entity
+    collisions = tuple((obj.x, obj.y, obj.width, obj.height) for obj in tmx.get_layer_by_name('collisions'))
+    entities = tuple((obj.name, obj.x, obj.y) for obj in tmx.get_layer_by_name('entities'))
+
+    # detect doors from a 'doors' object layer
+    doors = {'top': False, 'bottom': False, 'left': False, 'right': False}
+    if 'doors' in layer_names:
+        for obj in tmx.get_layer_by_name('doors'):
+            if obj.name and obj.name.lower() in doors:
+                doors[obj.name.lower()] = True
+
+    # every room placed from the same template shares one surface
+    surf = pygame.Surface((tmx.width * TILE_SIZE, tmx.height * TILE_SIZE), pygame.SRCALPHA)
+    for layer_name in TILE_LAYERS:
+        if layer_name in layer_names:
+            for x, y, image in tmx.get_layer_by_name(layer_name).tiles():
+                surf.blit(image, (x * TILE_SIZE, y * TILE_SIZE))
+
+    # rooms with no see-through pixels blit faster without the alpha channel
+    if pygame.mask.from_surface(surf, 254).count() == surf.get_width() * surf.get_height():
+        surf = surf.convert()
+
+    return RoomTemplate(path, tmx.width, tmx.height, collisions, entities, doors, surf)
+
+class RoomTemplate:
+    '''Everything a room needs from its map, loaded once and shared by every room placed from it'''
+    def __init__(self, path, width, height, collisions, entities, doors, surface):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.collisions = tuple(collisions)
+        self.entities = tuple(entities)
+        self.doors = MappingProxyType(dict(doors))
+        self.surface = surface
 
 class Room:
-    def __init__(self, path, doors=None):
-        # path: path to tmx file
+    def __init__(self, template, doors=None):
+        # template: parsed tmx shared between rooms
         # doors: dict {'top': False, 'bottom': False, 'left': True, 'right': False}
 
-        self.path = path
-        self.tmx = pytmx.load_pygame(path)
-        self.doors = doors or {'top': False, 'bottom': False, 'left': False, 'right': False}
-        self.width = self.tmx.width
-        self.height = self.tmx.height
+        self.template = template
+        self.path = template.path
+        self.doors = doors or dict(template.doors)
+        self.width = template.width
+        self.height = template.height
         
         # enemy spawning for each room
         self.enemies_spawned = False
         self.spawn_points = []
+
+        # wall and door colliders, only alive while the room is realised
+        self.colliders = []
         self.enemies = []
         self.loot_spawned = False
         self.is_start = False
@@ -26,6 +88,29 @@ class Room:
         self.visited = False
         self.cleared = False
 
+class RoomIndex:
+    '''Finds the room under a world position with grid arithmetic instead of scanning every room'''
+    def __init__(self, rooms, positions):
+        self.rooms = rooms
+        self.positions = positions
+
+        # rooms are placed at grid * room size, the start room sets the grid spacing
+        origin = rooms[(0, 0)]
+        self.room_width = origin.width * TILE_SIZE
+        self.room_height = origin.height * TILE_SIZE
+
+    def room_at(self, pos):
+        grid = (int(pos[0] // self.room_width), int(pos[1] // self.room_height))
+        room = self.rooms.get(grid)
+        if room is None:
+            return None
+
+        # a smaller room does not fill its whole grid cell
+        room_x, room_y = self.positions[grid]
+        if room_x <= pos[0] < room_x + room.width * TILE_SIZE and room_y <= pos[1] < room_y + room.height * TILE_SIZE:
+            return grid
+        return None
+
 def import_rooms():
     # import normal rooms and the start room
     rooms = []
@@ -36,15 +121,7 @@ def import_rooms():
             continue
 
         path = join(ROOMS_DIR, filename)
-        tmx = pytmx.load_pygame(path) 
-
-        # detect doors from a 'doors' object layer
-        doors = {'top': False, 'bottom': False, 'left': False, 'right': False}
-        for obj in tmx.get_layer_by_name('doors'):
-            if hasattr(obj, 'name') and obj.name.lower() in doors:
-                doors[obj.name.lower()] = True
-
-        room = Room(path, doors)
+        room = Room(load_template(path))
 
         # detect start room
         if 'start' in filename.lower():
@@ -74,7 +151,7 @@ def generate_map_with_positions(start_room, rooms, max_rooms):
             candidates = rooms  # fallback
 
         template_room = random.choice(candidates)
-        room = Room(template_room.path, template_room.doors.copy())
+        room = Room(template_room.template, template_room.doors.copy())
         new_grid = get_new_grid((gx, gy), direction)
         if new_grid in placed:
             continue
@@ -113,49 +190,38 @@ def get_new_grid(grid, direction):
     if direction == 'left': return (gx-1, gy)
     if direction == 'right': return (gx+1, gy)
 
-def add_room_colliders_with_doors(placed, positions, all_sprites, collision_sprites, tile_size=2 * TILE_SIZE, door_size=DOOR_SIZE):
-    # adds colliders to all walls with no adjacent rooms
-
-    # load textures once outsite the collider
-    WALL_TOP    = pygame.image.load(join('maps','tsx','tboi','door','up.png')).convert_alpha()
-    WALL_BOTTOM = pygame.image.load(join('maps','tsx','tboi','door','down.png')).convert_alpha()
-    WALL_LEFT   = pygame.image.load(join('maps','tsx','tboi','door','left.png')).convert_alpha()
-    WALL_RIGHT  = pygame.image.load(join('maps','tsx','tboi','door','right.png')).convert_alpha()
-
-    TEXTURES = {
-        'top': WALL_TOP,
-        'bottom': WALL_BOTTOM,
-        'left': WALL_LEFT,
-        'right': WALL_RIGHT
-    }
-
-    class Collider(pygame.sprite.Sprite):
-        def __init__(self, rect, direction, groups):
-            super().__init__(groups)
-            self.rect = rect
-            self.old_rect = self.rect
-
-            img = TEXTURES[direction]
-            self.image = pygame.transform.scale(img, (rect.width, rect.height))
-    
-    for (gx, gy), room in placed.items():
-        px, py = positions[(gx, gy)]
-        w, h = room.width * tile_size , room.height * tile_size
-
-        # get neighbor room helper
-        def neighbor(pos, direction):
-            dx, dy = {'top':(0,-1),'bottom':(0,1),'left':(-1,0),'right':(1,0)}[direction]
-            return placed.get((pos[0]+dx,pos[1]+dy))
-
-        for direction in ['top','bottom','left','right']:
-            if not (room.doors.get(direction) and neighbor((gx,gy), direction)):
-                if direction == 'top':
-                    Collider(pygame.Rect(px, py, w, 2 * tile_size), direction, (all_sprites, collision_sprites))
-                elif direction == 'bottom':
-                    Collider(pygame.Rect(px, py+h-2 * tile_size, w, 2 * tile_size), direction, (all_sprites, collision_sprites))
-                elif direction == 'left':
-                    Collider(pygame.Rect(px, py, 2 *tile_size, h), direction, (all_sprites, collision_sprites))
-                elif direction == 'right':
-                    Collider(pygame.Rect(px+w-2 * tile_size, py, 2 *tile_size, h), direction, (all_sprites, collision_sprites))
-
-    return placed, positions
+# door textures, the asset cache loads and scales each one once
+DOOR_TEXTURES = {
+    'top': join('maps','tsx','tboi','door','up.png'),
+    'bottom': join('maps','tsx','tboi','door','down.png'),
+    'left': join('maps','tsx','tboi','door','left.png'),
+    'right': join('maps','tsx','tboi','door','right.png')
+}
+
+class DoorCollider(pygame.sprite.Sprite):
+    def __init__(self, rect, direction, groups):
+        super().__init__(groups)
+        self.rect = rect
+        self.old_rect = self.rect
+
+        self.image = assets.scaled(DOOR_TEXTURES[direction], (rect.width, rect.height))
+
+def add_room_colliders(grid, placed, positions, groups, tile_size=2 * TILE_SIZE):
+    # adds colliders to the walls of one room that have no adjacent room, returns them so the room can be released later
+    room = placed[grid]
+    px, py = positions[grid]
+    w, h = room.width * tile_size , room.height * tile_size
+    colliders = []
+
+    for direction in ['top','bottom','left','right']:
+        if not (room.doors.get(direction) and get_new_grid(grid, direction) in placed):
+            if direction == 'top':
+                colliders.append(DoorCollider(pygame.Rect(px, py, w, 2 * tile_size), direction, groups))
+            elif direction == 'bottom':
+                colliders.append(DoorCollider(pygame.Rect(px, py+h-2 * tile_size, w, 2 * tile_size), direction, groups))
+            elif direction == 'left':
+                colliders.append(DoorCollider(pygame.Rect(px, py, 2 *tile_size, h), direction, groups))
+            elif direction == 'right':
+                colliders.append(DoorCollider(pygame.Rect(px+w-2 * tile_size, py, 2 *tile_size, h), direction, groups))
+
+    return colliders
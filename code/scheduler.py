@@ -0,0 +1,86 @@
+from settings import *
+from profiler import profiler
+from pending import PendingSprites
+from time import perf_counter
+from math import ceil
+
+# room offsets that tick at full rate around the player's room
+ACTIVE_ROOM_OFFSETS = [(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)]
+
+class Scheduler:
+    '''Per-room sets of sprites to update, rooms away from the player tick at a reduced rate and released rooms not at all'''
+    def __init__(self, room_at, dormant_rate = DORMANT_ROOM_TICK_RATE):
+        self.room_at = room_at
+        self.dormant_rate = dormant_rate
+        self.rooms = {}
+        self.sprite_rooms = {}
+        # placed in a room on the next update
+        self.pending = PendingSprites(self.place)
+        # released rooms whose sprites do not update at all
+        self.frozen = set()
+        self.frame = 0
+        self.dormant_dt = 0
+
+    def add(self, sprite):
+        self.pending.add(sprite)
+
+    def remove(self, sprite):
+        self.pending.discard(sprite)
+        if sprite in self.sprite_rooms:
+            self.rooms[self.sprite_rooms.pop(sprite)].discard(sprite)
+
+    def clear(self):
+        self.rooms.clear()
+        self.sprite_rooms.clear()
+        self.pending.clear()
+
+    def room_of(self, sprite):
+        # room the sprite was in after its last update
+        return self.sprite_rooms.get(sprite)
+
+    def place(self, sprite):
+        # sprites outside every room (bullets past a wall, the boss arena edge) count as key None
+        key = self.room_at(sprite.rect.center)
+        old_key = self.sprite_rooms.get(sprite, key)
+        if old_key != key:
+            self.rooms[old_key].discard(sprite)
+        self.sprite_rooms[sprite] = key
+        self.rooms.setdefault(key, set()).add(sprite)
+
+    def active_rooms(self, room_key):
+        if room_key is None:
+            return {None}
+        x, y = room_key
+        return {(x + dx, y + dy) for dx, dy in ACTIVE_ROOM_OFFSETS} | {None}
+
+    def update(self, dt, room_key):
+        self.pending.flush()
+
+        active = self.active_rooms(room_key)
+        ticks = [(sprite, dt) for key in active for sprite in self.rooms.get(key, ())]
+
+        # dormant rooms catch up every few frames with the time they missed, rate 0 skips them
+        self.frame += 1
+        self.dormant_dt += dt
+        if self.dormant_rate and self.frame % self.dormant_rate == 0:
+            # split into steps no longer than DORMANT_MAX_STEP so bullets cannot jump a one tile wall
+            steps = ceil(self.dormant_dt / DORMANT_MAX_STEP)
+            step_dt = self.dormant_dt / steps if steps else 0
+            self.dormant_dt = 0
+            dormant = [sprite for key, sprites in self.rooms.items() if key not in active and key not in self.frozen for sprite in sprites]
+            for _ in range(steps):
+                ticks.extend((sprite, step_dt) for sprite in dormant)
+
+        timed = profiler.enabled
+        for sprite, sprite_dt in ticks:
+            # killed sprites have already left the scheduler
+            if sprite not in self.sprite_rooms:
+                continue
+            if timed:
+                start = perf_counter()
+                sprite.update(sprite_dt)
+                profiler.add(type(sprite).__name__, perf_counter() - start)
+            else:
+                sprite.update(sprite_dt)
+            if sprite in self.sprite_rooms:
+                self.place(sprite)
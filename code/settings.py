@@ -5,12 +5,18 @@ from os import walk
 WINDOW_WIDTH, WINDOW_HEIGHT = 1530, 950
 TILE_SIZE = 16
 
+# collision grid
+COLLISION_CELL_SIZE = TILE_SIZE * 2
+
 ROOM_COUNT = 5
+ROOM_REALISE_DISTANCE = 1 # rooms this many grid steps from the player get their colliders built
+ROOM_RELEASE_DISTANCE = 3 # and are released again past this distance
 
 # scale camera
 CAMERA_WIDTH = WINDOW_WIDTH // 2   # 2x zoom
 CAMERA_HEIGHT = WINDOW_HEIGHT // 2
 CAMERA_ZOOM = 1.2
+CAMERA_SURFACE_CACHE_SIZE = 8 # camera surfaces kept around for recently used zoom levels
 
 ENEMY_HEALTH = 5
 FLYING_ENEMY_HEALTH = 3
@@ -32,6 +38,12 @@ MAX_ENEMY_COUNT = 30
 ENEMY_DESPAWN_TIME = 20000 # ms
 ENEMY_SPEED = 100
 ENEMY_SPAWN_INTERVAL = 300
+SIM_DT = 1 / 60 # fixed timestep for headless runs
+FLOW_WALL_PENALTY = 20 # extra path cost for tiles next to a wall
+FLYING_SEPARATION_RADIUS = 20 # pixels
+DORMANT_ROOM_TICK_RATE = 4 # rooms away from the player update every 4th frame, 0 freezes them
+DORMANT_MAX_STEP = 1 / 30 # longest dormant catch up step in seconds, a bullet covers less than a tile in it
+BATCHED_ENEMY_UPDATE = True # vectorised enemy movement, needs numpy
 
 #BOSS
 BOSS_HEALTH = 500
@@ -50,9 +62,11 @@ TURRET_FIRE_RATE = 0.5
 TURRET_FIRE_INTERVAL = 100
 TURRET_RANGE = 300
 TURRET_DAMAGE = 1
+TURRET_ROTATION_STEP = 2 # degrees between cached gun rotations
 
 BULLET_LIFETIME = 1000
 BULLET_SPEED = 350
+BULLET_ROTATION_STEP = 90 # degrees the bullet spins each frame
 
 TRAP_DAMAGE = 5
 TRAP_ANIMATION_SPEED = 0.25
@@ -86,6 +100,7 @@ RANGE_UPGRADE = 125
 
 # custom font
 FONT_PATH = join('font', 'ScienceGothic.ttf')
+TEXT_CACHE_SIZE = 256 # rendered text surfaces kept around
 
 # room placement
 ROOMS_DIR = join('maps', 'tsx', 'tboi')
@@ -95,4 +110,20 @@ DOOR_SIZE = 64
 MIN_ENEMY_COUNT = 1
 MAX_ENEMY_COUNT = 3
 
-LOOT_DROP_CHANCE = 0.5
\ No newline at end of file
+LOOT_DROP_CHANCE = 0.5
+# asset cache
+ASSET_CACHE_DIR = join('.cache', 'assets')
+BAKE_ASSET_ATLAS = True # pack every loaded image into one png so later launches skip decoding and rescaling
+ASSET_ATLAS_WIDTH = 2048
+
+# compiled level cache, written next to each tmx on first load
+LEVEL_CACHE = True
+LEVEL_CACHE_SUFFIX = '.cache'
+
+# frame profiler
+PROFILER_WINDOW = 240 # frames kept for the rolling percentiles
+PROFILER_TRACE_FRAMES = 600 # most recent frames written to a chrome trace
+PROFILER_OVERLAY_INTERVAL = 15 # frames between overlay refreshes, the text would churn the font cache every frame
+PROFILER_OVERLAY_KEY = pygame.K_F3
+PROFILER_TRACE_KEY = pygame.K_F4
+PROFILER_TRACE_DIR = join('.cache', 'profile')
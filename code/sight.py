@@ -0,0 +1,109 @@
+from settings import *
+from profiler import profiler
+from time import perf_counter
+
+class OccupancyGrid:
+    '''Per-room grids of blocked cells rasterised from the collision sprites'''
+    def __init__(self, collision_sprites, cell_size = TILE_SIZE):
+        self.collision_sprites = collision_sprites
+        self.cell_size = cell_size
+        self.grids = {}
+        self.cols = 0
+        self.rows = 0
+
+    def build(self, rooms, room_positions):
+        self.grids = {}
+        for key, room in rooms.items():
+            self.add_room(key, room, room_positions[key])
+
+    def add_room(self, key, room, pos):
+        # rooms sit on a regular grid, so every room shares the same cell dimensions
+        self.cols = room.width * TILE_SIZE // self.cell_size
+        self.rows = room.height * TILE_SIZE // self.cell_size
+        self.grids[key] = bytearray(self.cols * self.rows)
+
+        px, py = pos
+        self.refresh(pygame.Rect(px, py, self.cols * self.cell_size, self.rows * self.cell_size))
+
+    def remove_room(self, key):
+        self.grids.pop(key, None)
+
+    def cell_at(self, pos):
+        return int(pos[0] // self.cell_size), int(pos[1] // self.cell_size)
+
+    def blocked(self, cx, cy):
+        grid = self.grids.get((cx // self.cols, cy // self.rows))
+        if grid is None:
+            return True # outside every room
+        return grid[(cy % self.rows) * self.cols + cx % self.cols] == 1
+
+    def refresh(self, rect):
+        # re-rasterise every cell touched by rect, a cell is blocked when its center lies inside a wall
+        cs = self.cell_size
+        left, top = self.cell_at(rect.topleft)
+        right, bottom = self.cell_at((rect.right - 1, rect.bottom - 1))
+
+        cells = {}
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                grid = self.grids.get((cx // self.cols, cy // self.rows))
+                if grid is not None:
+                    cells[(cx, cy)] = grid
+                    grid[(cy % self.rows) * self.cols + cx % self.cols] = 0
+
+        for sprite in self.collision_sprites.query(rect):
+            wall = sprite.rect
+            for cx in range(max(left, int((wall.left - cs / 2) // cs)), min(right, int((wall.right - cs / 2) // cs)) + 1):
+                for cy in range(max(top, int((wall.top - cs / 2) // cs)), min(bottom, int((wall.bottom - cs / 2) // cs)) + 1):
+                    grid = cells.get((cx, cy))
+                    if grid is not None and wall.collidepoint((cx + 0.5) * cs, (cy + 0.5) * cs):
+                        grid[(cy % self.rows) * self.cols + cx % self.cols] = 1
+
+class LineOfSight:
+    '''Answers line of sight queries by walking the occupancy grid cell by cell'''
+    def __init__(self, grid):
+        self.grid = grid
+        self.cache = {}
+
+    def new_frame(self):
+        self.cache.clear()
+
+    def has_line_of_sight(self, start, end):
+        key = (self.grid.cell_at(start), self.grid.cell_at(end))
+        result = self.cache.get(key)
+        if result is None:
+            if profiler.enabled:
+                t0 = perf_counter()
+                result = self.cache[key] = self.trace(*key)
+                profiler.add('line of sight', perf_counter() - t0)
+            else:
+                result = self.cache[key] = self.trace(*key)
+        return result
+
+    def trace(self, start_cell, end_cell):
+        # bresenham between the two cells, the end cells themselves are ignored
+        # so entities standing next to a wall can still see each other
+        if start_cell == end_cell:
+            return True
+
+        x, y = start_cell
+        end_x, end_y = end_cell
+        dx = abs(end_x - x)
+        dy = -abs(end_y - y)
+        step_x = 1 if x < end_x else -1
+        step_y = 1 if y < end_y else -1
+        err = dx + dy
+        blocked = self.grid.blocked
+
+        while True:
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x += step_x
+            if e2 <= dx:
+                err += dx
+                y += step_y
+            if x == end_x and y == end_y:
+                return True
+            if blocked(x, y):
+                return False
@@ -0,0 +1,70 @@
+from settings import *
+
+class SpatialHash:
+    '''Uniform grid that buckets sprites by the cells their rect overlaps'''
+    def __init__(self, cell_size = COLLISION_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.sprite_cells = {}
+
+    def cells_for(self, rect):
+        left = int(rect.left // self.cell_size)
+        right = int(rect.right // self.cell_size)
+        top = int(rect.top // self.cell_size)
+        bottom = int(rect.bottom // self.cell_size)
+        return [(x, y) for x in range(left, right + 1) for y in range(top, bottom + 1)]
+
+    def insert(self, sprite):
+        if sprite in self.sprite_cells:
+            self.remove(sprite)
+
+        cells = self.cells_for(sprite.rect)
+        for cell in cells:
+            self.cells.setdefault(cell, []).append(sprite)
+        self.sprite_cells[sprite] = cells
+
+    def remove(self, sprite):
+        cells = self.sprite_cells.pop(sprite, None)
+        if cells is None:
+            return
+
+        for cell in cells:
+            bucket = self.cells[cell]
+            bucket.remove(sprite)
+            if not bucket:
+                del self.cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.sprite_cells.clear()
+
+    def query(self, rect):
+        # returns every sprite sharing a cell with rect, callers still do the exact rect test
+        found = {}
+        for cell in self.cells_for(rect):
+            bucket = self.cells.get(cell)
+            if bucket:
+                for sprite in bucket:
+                    found[sprite] = None
+        return list(found)
+
+class NeighbourIndex:
+    '''Buckets sprites by the cell holding their center, meant to be rebuilt once per frame'''
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def rebuild(self, sprites):
+        self.cells = {}
+        for sprite in sprites:
+            x, y = sprite.rect.center
+            self.cells.setdefault((int(x // self.cell_size), int(y // self.cell_size)), []).append(sprite)
+
+    def nearby(self, pos):
+        # sprites in the 3x3 block of cells around pos, covers any radius up to cell_size
+        cx, cy = int(pos[0] // self.cell_size), int(pos[1] // self.cell_size)
+        for x in (cx - 1, cx, cx + 1):
+            for y in (cy - 1, cy, cy + 1):
+                bucket = self.cells.get((x, y))
+                if bucket:
+                    yield from bucket
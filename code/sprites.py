@@ -1,4 +1,6 @@
 from settings import *
+from assets import assets
+from fonts import fonts
 
 class Sprite(pygame.sprite.Sprite):
     def __init__(self, pos, surf, groups, ground = False):
@@ -10,6 +12,8 @@ class Sprite(pygame.sprite.Sprite):
         self.old_rect = self.rect.copy()
 
 class Trap(pygame.sprite.Sprite):
+    render_layer = 'trap'
+
     def __init__(self, pos, surf, groups, animation_frames, game):
         super().__init__(groups)
         self.image = surf
@@ -33,7 +37,8 @@ class Trap(pygame.sprite.Sprite):
         self.animation_speed = TRAP_ANIMATION_SPEED
         self.animation_time = TRAP_ANIMATION_TIME
     
-    def update(self, dt, enemies):
+    def update(self, dt):
+        enemies = self.game.enemy_sprites
         if not self.triggered:
             self.check_collision(enemies)
         else:
@@ -64,6 +69,8 @@ class Trap(pygame.sprite.Sprite):
                 self.image = self.animation_frames[int(self.frame_index)]
 
 class BarbedWire(pygame.sprite.Sprite):
+    render_layer = 'trap'
+
     def __init__(self, pos, surf, groups, game, rotation = 0, slow_factor = WIRE_SLOW_FACTOR):
         super().__init__(groups)
 
@@ -80,8 +87,8 @@ class BarbedWire(pygame.sprite.Sprite):
         self.slow_factor = slow_factor
         self.affected_enemies = set()
 
-    def update(self, dt, enemies):
-        hits = pygame.sprite.spritecollide(self, enemies, False, pygame.sprite.collide_mask)
+    def update(self, dt):
+        hits = pygame.sprite.spritecollide(self, self.game.enemy_sprites, False, pygame.sprite.collide_mask)
         current_enemies = set(hits)
 
         for enemy in current_enemies - self.affected_enemies:
@@ -111,7 +118,7 @@ class Bomb(pygame.sprite.Sprite):
 
         self.exploded = False
         self.lifetime = 3000
-        self.spawn_time = pygame.time.get_ticks()
+        self.spawn_time = self.game.game_clock.get_ticks()
 
     def update(self, dt):
         direction = (self.target_pos - self.pos)
@@ -123,7 +130,7 @@ class Bomb(pygame.sprite.Sprite):
                 move = direction * distance
             self.pos += move
             self.rect.center = self.pos
-        elapsed = pygame.time.get_ticks() - self.spawn_time
+        elapsed = self.game.game_clock.get_ticks() - self.spawn_time
         if elapsed >= self.lifetime and not self.exploded:
             self.explode()            
 
@@ -132,7 +139,7 @@ class Bomb(pygame.sprite.Sprite):
         draw_pos = pygame.Vector2(self.rect.topleft) + cam_offset
         surface.blit(self.image, draw_pos)
 
-        elapsed = pygame.time.get_ticks() - self.spawn_time
+        elapsed = self.game.game_clock.get_ticks() - self.spawn_time
         remaining_ratio = max(0, (self.lifetime - elapsed) / self.lifetime)
 
         bar_width = self.rect.width
@@ -157,8 +164,7 @@ class Upgrade(pygame.sprite.Sprite):
         self.upgrade_type = upgrade_type
 
         upgrade_data = next(upgrade for upgrade in UPGRADES if upgrade['name'] == upgrade_type)
-        self.icon = pygame.image.load(upgrade_data['image']).convert_alpha()
-        self.icon = pygame.transform.scale(self.icon, (25, 25))
+        self.icon = assets.scaled(upgrade_data['image'], (25, 25))
         self.image = pygame.Surface((UPGRADE_SIZE, UPGRADE_SIZE), pygame.SRCALPHA)
         self.rect = self.image.get_frect(center=pos)
         self.image.set_alpha(120)
@@ -182,8 +188,7 @@ class Upgrade(pygame.sprite.Sprite):
         surface.blit(self.image, draw_pos)
         icon_rect = self.icon.get_frect(center=self.rect.center + offset)
 
-        font = pygame.font.Font(FONT_PATH, 12)
-        text_surf = font.render(self.upgrade_type, True, (255,255,255))
+        text_surf = fonts.render(self.upgrade_type, 12, (255,255,255))
         text_rect = text_surf.get_frect(midtop=(icon_rect.centerx, icon_rect.bottom ))
         surface.blit(text_surf, text_rect)
         # draw icon centered
@@ -193,8 +198,7 @@ class Upgrade(pygame.sprite.Sprite):
 class Portal(pygame.sprite.Sprite):
     def __init__(self, pos, game):
         super().__init__(game.all_sprites)
-        self.image = pygame.image.load(join('images', 'portal', 'portal.png')).convert_alpha()
-        self.image = pygame.transform.scale(self.image, (135, 135))
+        self.image = assets.scaled(join('images', 'portal', 'portal.png'), (135, 135))
         self.rect = self.image.get_frect(center=pos)
         self.game = game
 
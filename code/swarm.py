@@ -0,0 +1,129 @@
+from settings import *
+
+# numpy is optional, without it enemies fall back to the per-sprite movement code
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# slot states
+FREE, WALKING, FLYING, DEAD = 0, 1, 2, 3
+
+# cells are keyed as one integer per cell, x in the high bits, so a sorted key array can be searched per cell
+CELL_KEY_OFFSET = 1 << 20
+CELL_KEY_STRIDE = 1 << 21
+NEIGHBOUR_CELLS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+def make_enemy_store():
+    if np is None or not BATCHED_ENEMY_UPDATE:
+        return None
+    return EnemyStore()
+
+class EnemyStore:
+    '''Structure of arrays for enemy kinematics, updated in one vectorised pass per frame'''
+    def __init__(self, capacity = 64):
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.speed = np.zeros(capacity)
+        self.health = np.zeros(capacity)
+        self.state = np.zeros(capacity, np.int8)
+        self.free = list(range(capacity - 1, -1, -1))
+
+        # python copies of the last pass so sprites can read their row without numpy indexing
+        self.directions = [[0.0, 0.0]] * capacity
+        self.velocities = [[0.0, 0.0]] * capacity
+
+    def grow(self):
+        capacity = len(self.state)
+        self.pos = np.concatenate((self.pos, np.zeros((capacity, 2))))
+        self.vel = np.concatenate((self.vel, np.zeros((capacity, 2))))
+        self.speed = np.concatenate((self.speed, np.zeros(capacity)))
+        self.health = np.concatenate((self.health, np.zeros(capacity)))
+        self.state = np.concatenate((self.state, np.zeros(capacity, np.int8)))
+        self.free = list(range(2 * capacity - 1, capacity - 1, -1)) + self.free
+        self.directions = self.directions + [[0.0, 0.0]] * capacity
+        self.velocities = self.velocities + [[0.0, 0.0]] * capacity
+
+    def add(self, pos, speed, health, flying):
+        if not self.free:
+            self.grow()
+
+        slot = self.free.pop()
+        self.pos[slot] = pos
+        self.vel[slot] = 0
+        self.speed[slot] = speed
+        self.health[slot] = health
+        self.state[slot] = FLYING if flying else WALKING
+        return slot
+
+    def remove(self, slot):
+        # returns the last speed and health so the sprite can keep them
+        values = float(self.speed[slot]), float(self.health[slot])
+        self.state[slot] = FREE
+        self.free.append(slot)
+        return values
+
+    def clear(self):
+        self.state[:] = FREE
+        self.free = list(range(len(self.state) - 1, -1, -1))
+
+    def update(self, dt, player_pos):
+        moving = (self.state == WALKING) | (self.state == FLYING)
+        if not moving.any():
+            return
+
+        # chase direction for every enemy at once
+        to_player = np.asarray(player_pos, dtype=float) - self.pos
+        dist = np.hypot(to_player[:, 0], to_player[:, 1])
+        directions = np.zeros_like(to_player)
+        np.divide(to_player, dist[:, None], out=directions, where=(dist > 0)[:, None] & moving[:, None])
+
+        # speed already includes barbed wire slowdown because the wire scales the speed array
+        self.vel = directions * self.speed[:, None]
+
+        flying = np.flatnonzero(self.state == FLYING)
+        if len(flying):
+            self.vel[flying] += self.separation(flying, np.flatnonzero(moving))
+
+        self.directions = directions.tolist()
+        self.velocities = self.vel.tolist()
+
+    def separation(self, flying, others):
+        # push every flying enemy away from any enemy closer than the separation radius, only enemies
+        # in the 3x3 block of radius sized cells around it are compared, like NeighbourIndex.nearby
+        radius = FLYING_SEPARATION_RADIUS
+        cells = np.floor(self.pos / radius).astype(np.int64) + CELL_KEY_OFFSET
+        keys = cells[:, 0] * CELL_KEY_STRIDE + cells[:, 1]
+
+        order = others[np.argsort(keys[others], kind='stable')]
+        sorted_keys = keys[order]
+
+        pair_flying = []
+        pair_other = []
+        for dx, dy in NEIGHBOUR_CELLS:
+            wanted = keys[flying] + dx * CELL_KEY_STRIDE + dy
+            lo = np.searchsorted(sorted_keys, wanted, 'left')
+            hi = np.searchsorted(sorted_keys, wanted, 'right')
+            counts = hi - lo
+            total = int(counts.sum())
+            if not total:
+                continue
+            # expand every (flying enemy, cell range) into one row per enemy in the range
+            starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+            pair_flying.append(np.repeat(np.arange(len(flying)), counts))
+            pair_other.append(order[starts + np.arange(total)])
+
+        push = np.zeros((len(flying), 2))
+        if not pair_flying:
+            return push
+
+        pair_flying = np.concatenate(pair_flying)
+        offset = self.pos[flying[pair_flying]] - self.pos[np.concatenate(pair_other)]
+        dist = np.hypot(offset[:, 0], offset[:, 1])
+        close = (dist > 0) & (dist < radius)
+        weight = np.zeros_like(dist)
+        np.divide(radius - dist, dist, out=weight, where=close)
+
+        push[:, 0] = np.bincount(pair_flying, offset[:, 0] * weight, len(flying))
+        push[:, 1] = np.bincount(pair_flying, offset[:, 1] * weight, len(flying))
+        return push
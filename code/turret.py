@@ -1,6 +1,28 @@
 from settings import *
 from math import atan2, degrees
-from bullet import Bullet
+
+# rotated gun images and their center offsets from the pivot, keyed by (gun surface, step, angle index)
+gun_rotation_cache = {}
+
+def rotated_gun(gun_surf, angle, step = TURRET_ROTATION_STEP):
+    index = round(angle / step) % round(360 / step)
+    key = (gun_surf, step, index)
+
+    if key not in gun_rotation_cache:
+        rot_angle = index * step
+        rotated_image = pygame.transform.rotate(gun_surf, rot_angle)
+
+        orig_rect = gun_surf.get_frect()
+        pivot = pygame.Vector2(orig_rect.center, orig_rect.height / 2)
+
+        orig_center = pygame.Vector2(orig_rect.center)
+        vec_center_to_pivot = pivot - orig_center
+
+        # the rotated image is centered this far away from the pivot
+        rotated_vec = vec_center_to_pivot.rotate(rot_angle)
+        gun_rotation_cache[key] = (rotated_image, -rotated_vec)
+
+    return gun_rotation_cache[key]
 
 class Turret(pygame.sprite.Sprite):
     def __init__(self, pos, surf, gun_surf, groups, bullet_surf, bullet_sprites, all_sprites, collision_sprites, enemy_sprites, game):
@@ -23,7 +45,6 @@ class Turret(pygame.sprite.Sprite):
         self.last_shot_time = 0
 
         self.current_target = None
-        self.nearby_walls = []
 
         # gun
         self.gun_original = gun_surf
@@ -37,11 +58,11 @@ class Turret(pygame.sprite.Sprite):
         self.los_check_interval = 500 # ms
         self.shoot_timer = 0
 
-        self.last_los_check = pygame.time.get_ticks()
-        self.last_shot_time = pygame.time.get_ticks()
+        self.last_los_check = self.game.game_clock.get_ticks()
+        self.last_shot_time = self.game.game_clock.get_ticks()
 
         # health (lifetime)
-        self.spawn_time = pygame.time.get_ticks()
+        self.spawn_time = self.game.game_clock.get_ticks()
         self.lifetime = TURRET_LIFETIME
 
     def find_target(self):
@@ -57,10 +78,6 @@ class Turret(pygame.sprite.Sprite):
                     min_dist = distance
                     closest_enemy = enemy
         self.current_target = closest_enemy
-        if self.current_target:
-            self.nearby_walls = self.get_nearby_walls(pygame.Vector2(self.current_target.rect.center))
-        else:
-            self.nearby_walls = []
 
     def update_target(self, dt):
         self.los_timer += dt
@@ -68,47 +85,16 @@ class Turret(pygame.sprite.Sprite):
             self.los_timer = 0
             if (self.current_target is None or self.current_target not in self.enemy_sprites or
                 (pygame.Vector2(self.current_target.rect.center) - self.pos).length() > self.range_radius):
-                self.current_target = self.find_target()
-                if self.current_target:
-                    self.nearby_walls = self.get_nearby_walls(pygame.Vector2(self.current_target.rect.center))
-                else:
-                    self.nearby_walls = []
-
-    def get_nearby_walls(self, target_pos, margin=64):
-        min_x = min(self.pos.x, target_pos.x) - margin
-        max_x = max(self.pos.x, target_pos.x) + margin
-        min_y = min(self.pos.y, target_pos.y) - margin
-        max_y = max(self.pos.y, target_pos.y) + margin
-
-        nearby_walls = [wall for wall in self.collision_sprites
-                        if min_x <= wall.rect.right and max_x >= wall.rect.left
-                        and min_y <= wall.rect.top and max_y >= wall.rect.bottom]
-        return nearby_walls
+                self.find_target()
     
     def has_line_of_sight(self, target_pos):
-        if not self.nearby_walls:
-            return True
-
-        direction = target_pos - self.pos
-        steps = int(direction.length())
-        if steps == 0:
-            return True
-        
-        direction = direction.normalize()
-
-        for i in range(0, steps, 10):
-            check_pos = self.pos + direction * i
-            check_rect = pygame.Rect(check_pos.x, check_pos.y, 2, 2)
-            for wall in self.nearby_walls:
-                if wall.rect.colliderect(check_rect):
-                    return False
-        return True
+        return self.game.sight.has_line_of_sight(self.pos, target_pos)
 
     def shoot(self):
         if not self.current_target:
             return
         
-        now = pygame.time.get_ticks()
+        now = self.game.game_clock.get_ticks()
         fire_interval = self.turret_interval / self.fire_rate
 
         if now - self.last_shot_time >= fire_interval:
@@ -121,7 +107,7 @@ class Turret(pygame.sprite.Sprite):
             gun_tip_offset = pygame.Vector2(self.gun_image.get_width(), 0).rotate(-direction.angle_to(pygame.Vector2(1,0)))
             bullet_pos = self.pos + gun_tip_offset
 
-            Bullet(self.bullet_surf, bullet_pos, direction, self.bullet_lifetime, self, (self.bullet_sprites, self.all_sprites), self.collision_sprites, self.enemy_sprites, self.game)
+            self.game.bullet_pool.acquire(self.bullet_surf, bullet_pos, direction, self.bullet_lifetime, self, (self.bullet_sprites, self.all_sprites), self.collision_sprites, self.enemy_sprites, self.game)
     
     def rotate_gun(self, target_pos):
         dir_vec = pygame.Vector2(target_pos) - self.pos
@@ -134,28 +120,30 @@ class Turret(pygame.sprite.Sprite):
         angle_deg = degrees(angle_rad)
 
         rot_angle = -angle_deg
-        
-        rotated_image = pygame.transform.rotate(self.gun_original, rot_angle)
-        rotated_rect = rotated_image.get_frect()
 
-        orig_rect = self.gun_original.get_frect()
-        pivot = pygame.Vector2(orig_rect.center, orig_rect.height / 2)
-
-        orig_center = pygame.Vector2(orig_rect.center)
-        vec_center_to_pivot = pivot - orig_center
-
-        rotated_vec = vec_center_to_pivot.rotate(rot_angle)
-
-        world_pivot = pygame.Vector2(self.pos)
-        rotated_center = world_pivot - rotated_vec
-
-        rotated_rect.center = (rotated_center.x, rotated_center.y)
-
-        self.gun_image = rotated_image
-        self.gun_rect = rotated_rect
+        self.gun_image, center_offset = rotated_gun(self.gun_original, rot_angle)
+        self.gun_rect = self.gun_image.get_frect(center = self.pos + center_offset)
     
+    def draw(self, surface, offset):
+        # turret base
+        base_rect = self.rect.move(offset)
+        surface.blit(self.image, base_rect)
+
+        # turret gun
+        surface.blit(self.gun_image, self.gun_rect.move(offset))
+
+        # turret healthbar
+        bar_width = base_rect.width
+        bar_height = 5
+        elapsed = self.game.game_clock.get_ticks() - self.spawn_time
+        remaining_ratio = max(0, (self.lifetime - elapsed) / self.lifetime)
+        bar_bg_rect = pygame.Rect(base_rect.x, base_rect.y - 10, bar_width, bar_height)
+        bar_fg_rect = pygame.Rect(base_rect.x, base_rect.y - 10, bar_width * remaining_ratio, bar_height)
+        pygame.draw.rect(surface, (80, 80, 80), bar_bg_rect)
+        pygame.draw.rect(surface, (0, 255, 50), bar_fg_rect)
+
     def update(self, dt):
-        now = pygame.time.get_ticks()
+        now = self.game.game_clock.get_ticks()
         elapsed = now - self.spawn_time
         # destroy turret if alive for TURRET_LIFETIME seconds
         if elapsed >= self.lifetime: